@@ -0,0 +1,122 @@
+"""
+Builds the paper's figures from the data in data/.
+
+Statistics are computed once per input and cached in .figcache/, keyed by a
+hash of the data file and the code that computes them. Figures are rendered
+in parallel worker processes, and a figure is skipped when neither its
+statistics nor its plotting code changed since it was last rendered.
+
+    python figures.py                 # every figure that is out of date
+    python figures.py fig2.pdf        # only this figure
+    python figures.py --force         # re-render everything
+"""
+import os
+import sys
+import json
+import hashlib
+import argparse
+import importlib
+import tempfile
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+HERE = Path(__file__).resolve().parent
+CACHE = HERE / ".figcache"
+
+# Statistics name -> (input file, module whose compute() derives them; None uses the data as is)
+STATS = {
+    'scores': ("data/scores.json", "fig1_stat"),
+    'grader_accuracy': ("data/grader_accuracy.json", "fig3"),
+    'costs': ("data/costs.json", None),
+}
+# Figure modules; each defines OUTPUT, STATS (a key above) and render(stats, output)
+FIGURES = ["fig1", "fig2", "fig3"]
+
+
+def _digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else part.encode('utf-8'))
+        h.update(b"\0")
+    return h.hexdigest()[:16]
+
+
+def _source(*modules):
+    return b"".join((HERE / f"{module}.py").read_bytes() for module in modules)
+
+
+def _write_atomic(path, text):
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def load_stats(name):
+    """The statistics for one input, from the cache when the data and the computing code are unchanged."""
+    path, module = STATS[name]
+    data = (HERE / path).read_bytes()
+    key = _digest(data, _source(module) if module else b"")
+    cached = CACHE / f"{name}-{key}.json"
+    if cached.exists():
+        return json.loads(cached.read_text(encoding='utf-8'))
+
+    print(f"Computing statistics for {path}")
+    result = json.loads(data)
+    if module:
+        result = importlib.import_module(module).compute(result)
+    CACHE.mkdir(exist_ok=True)
+    for stale in CACHE.glob(f"{name}-*.json"):
+        stale.unlink()
+    _write_atomic(cached, json.dumps(result))
+    return result
+
+
+def _render(module, stats_json, output):
+    """Runs in a worker process."""
+    importlib.import_module(module).render(json.loads(stats_json), output)
+    return output
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the paper's figures, skipping those that are up to date.")
+    parser.add_argument("figures", nargs="*", help="figure files or modules to build (default: all)")
+    parser.add_argument("--force", action="store_true", help="re-render even if nothing changed")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="worker processes")
+    args = parser.parse_args(argv)
+
+    os.chdir(HERE)
+    sys.path.insert(0, str(HERE))
+    modules = {name: importlib.import_module(name) for name in FIGURES}
+    selected = [name for name, module in modules.items()
+                if not args.figures or name in args.figures or module.OUTPUT in args.figures]
+    unknown = set(args.figures) - set(selected) - {modules[name].OUTPUT for name in selected}
+    if unknown:
+        parser.error(f"unknown figure(s): {', '.join(sorted(unknown))}")
+
+    stats = {key: json.dumps(load_stats(key)) for key in {modules[name].STATS for name in selected}}
+
+    jobs = {}
+    for name in selected:
+        module = modules[name]
+        key = _digest(stats[module.STATS], _source(name, "paperstyle"))
+        stamp = CACHE / f"{module.OUTPUT}.key"
+        if not args.force and Path(module.OUTPUT).exists() and stamp.exists() and stamp.read_text() == key:
+            print(f"{module.OUTPUT} is up to date")
+            continue
+        jobs[name] = (stamp, key)
+
+    if not jobs:
+        return
+    CACHE.mkdir(exist_ok=True)
+    with ProcessPoolExecutor(max_workers=max(1, min(args.jobs or 1, len(jobs)))) as pool:
+        futures = {name: pool.submit(_render, name, stats[modules[name].STATS], modules[name].OUTPUT) for name in jobs}
+        for name, future in futures.items():
+            output = future.result()
+            stamp, key = jobs[name]
+            _write_atomic(stamp, key)
+            print(f"Rendered {output}")
+
+
+if __name__ == "__main__":
+    main()
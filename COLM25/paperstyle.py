@@ -0,0 +1,21 @@
+import matplotlib
+matplotlib.use('Agg') # Figures are only written to files; no display is needed in pool workers
+import matplotlib.pyplot as plt
+
+font = {'family' : 'DejaVu Sans', 'weight' : 'normal', 'size'   : 14, }
+lines = {'linewidth' : 2, 'color' : 'black'}
+axes = {'edgecolor' : 'black', 'grid' : True, 'titlesize' : 'medium'}
+grid = {'alpha' : 0.1, 'color' : 'black'}
+
+
+def apply_style(with_axes=True):
+    """The paper's shared matplotlib settings. fig2 keeps matplotlib's default axes (with_axes=False)."""
+    matplotlib.rcdefaults()
+    plt.style.use('default')
+    matplotlib.rc('font', **font)
+    matplotlib.rc('lines', **lines)
+    if with_axes:
+        matplotlib.rc('axes', **axes)
+    matplotlib.rc('grid', **grid)
+    matplotlib.rcParams['pdf.fonttype'] = 42
+    matplotlib.rcParams['ps.fonttype'] = 42
@@ -0,0 +1,215 @@
+"""
+Grading throughput/latency benchmark.
+
+Synthesizes classes of N students from assignment/*.json question sets, grades
+them with the fake LLM backend and reports throughput, per-question latency
+percentiles, peak Python memory and LLM calls per student, for the grade.py
+(Grader) and Playground flows. Results are written as JSON so runs on different
+commits can be compared:
+
+    python bench/bench_grading.py --sizes 10 100 --out before.json
+    python bench/bench_grading.py --sizes 10 100 --compare before.json
+"""
+import io
+import os
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import subprocess
+import contextlib
+from pathlib import Path
+
+import fake_llm  # Registers the 'fake' provider; also puts src/ on sys.path
+from fake_llm import FakeBackend
+from Grader import Grader
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+FILLER = ("the base is two so each position doubles and the symbols map to digits carry "
+          "overflow sign bit exponent mantissa gate register instruction").split()
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def latency_summary(values):
+    return {'p50': percentile(values, 50), 'p95': percentile(values, 95), 'p99': percentile(values, 99),
+            'mean': sum(values) / len(values) if values else None}
+
+
+def synthesize_class(questions, n_students, seed=0):
+    """{answers_<id>.json: submission} with answers of varied length, including some blanks."""
+    rng = random.Random(seed)
+    submissions = {}
+    for s in range(n_students):
+        submission = {}
+        for q in questions:
+            answers = []
+            for _ in q.get('instructions', []):
+                length = 0 if rng.random() < 0.05 else int(rng.lognormvariate(3.5, 0.8))
+                answers.append(" ".join(rng.choice(FILLER) for _ in range(length)))
+            submission[f"q{q['id']}"] = {'answers': answers}
+        submissions[f"answers_{s:05d}.json"] = submission
+    return submissions
+
+
+def bench_grader(assignment_path, submissions):
+    """Runs the grade.py flow (Grader.grade) on in-memory submissions."""
+    g = Grader()
+    g.set_model('fake:bench')
+    g.load_assignment(assignment_path)
+    g._student_answers.update(submissions)
+    start = time.perf_counter()
+    g.grade()
+    wall = time.perf_counter() - start
+    latencies = [q['time'] for result in g.final_results.values() for q in result.values()]
+    return wall, latencies
+
+
+def bench_playground(questions, submissions):
+    """Simulates students clicking Test on every question in a Playground."""
+    import ipywidgets as widgets
+    from playground import Playground
+
+    latencies = []
+    start = time.perf_counter()
+    for student_id, submission in submissions.items():
+        p = Playground()
+        p.set_model('fake:bench')
+        p.add_whitelist(student_id)
+        p.verify(student_id)
+        for q in questions:
+            p.create_question(q.get('text'))
+            for i, instruction in enumerate(q.get('instructions', [])):
+                p.add_instruction(instruction, q.get('testcases') if i == 0 else None)
+            for answer_widget, answer in zip(p._displayable[p._curr_question]['answers'], submission[p._curr_question]['answers']):
+                answer_widget.value = answer
+        for q_id in p._displayable:
+            t = time.perf_counter()
+            p.student_test_button(None, q_id, widgets.Output())
+            latencies.append(time.perf_counter() - t)
+        p.save_drafts() # Autosave now; a debounce timer firing later would write outside the work directory
+    return time.perf_counter() - start, latencies
+
+
+def run_case(flow, assignment_path, n_students, seed):
+    with open(assignment_path, 'r', encoding='utf-8') as f:
+        questions = json.load(f).get('questions', [])
+    submissions = synthesize_class(questions, n_students, seed)
+    fake_llm.reset()
+    tracemalloc.start()
+    # Console output is part of the real flows but would dominate and garble the benchmark output
+    with contextlib.redirect_stdout(io.StringIO()):
+        if flow == 'grade':
+            wall, latencies = bench_grader(assignment_path, submissions)
+        else:
+            wall, latencies = bench_playground(questions, submissions)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    n_questions = len(latencies)
+    return {
+        'flow': flow,
+        'assignment': Path(assignment_path).name,
+        'students': n_students,
+        'questions_graded': n_questions,
+        'wall_seconds': wall,
+        'questions_per_second': n_questions / wall if wall else None,
+        'question_latency_seconds': latency_summary(latencies),
+        'llm_calls': FakeBackend.calls,
+        'llm_failures': FakeBackend.failures,
+        'calls_per_student': FakeBackend.calls / n_students,
+        'peak_memory_mb': peak / 1e6,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """Prints the change in throughput and p95 latency against a previous results file."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(c['flow'], c['assignment'], c['students']): c for c in json.load(f)['cases']}
+    print(f"\n--- Compared with {baseline_path} ---")
+    for case in results['cases']:
+        old = baseline.get((case['flow'], case['assignment'], case['students']))
+        if not old:
+            continue
+        throughput = case['questions_per_second'] / old['questions_per_second'] - 1
+        p95_new, p95_old = case['question_latency_seconds']['p95'], old['question_latency_seconds']['p95']
+        p95 = p95_new / p95_old - 1 if p95_old else 0.0
+        print(f"  {case['flow']:<10} {case['assignment']:<22} n={case['students']:<5} "
+              f"throughput {throughput:+.1%}  p95 latency {p95:+.1%}  calls/student {case['calls_per_student']:.1f} "
+              f"(was {old['calls_per_student']:.1f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark grading throughput and latency with a fake LLM.")
+    parser.add_argument("--assignments", nargs="+", default=[str(PROJECT_ROOT / "assignment" / "1Integer.json")],
+                        help="question set files to synthesize students from")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10, 100, 1000], help="class sizes")
+    parser.add_argument("--flows", nargs="+", choices=["grade", "playground"], default=["grade", "playground"])
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="median fake LLM latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="log-normal latency spread")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of calls failing with a 429")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="where to write the JSON results (default: print only)")
+    parser.add_argument("--compare", metavar="BASELINE", help="earlier results file to compare against")
+    args = parser.parse_args()
+    # Grading runs in a temporary directory; resolve the caller's paths first
+    out = Path(args.out).resolve() if args.out else None
+    baseline = Path(args.compare).resolve() if args.compare else None
+
+    random.seed(args.seed)
+    fake_llm.configure(median_latency=args.latency_ms / 1000, latency_sigma=args.latency_sigma,
+                       failure_rate=args.failure_rate)
+    assignments = [str(Path(a).resolve()) for a in args.assignments]
+    results = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'settings': {'latency_ms': args.latency_ms, 'latency_sigma': args.latency_sigma,
+                     'failure_rate': args.failure_rate, 'seed': args.seed},
+        'cases': [],
+    }
+
+    # Grader writes grading_results.json to the working directory; keep it out of the project
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        os.environ['LLM_SCHEDULER_FILE'] = os.path.join(workdir, ".scheduler", "state.json") # Playgrounds share it
+        try:
+            # Warm-up pass so one-time costs (tokenizer loading, lazy imports) don't land in the first case
+            run_case(args.flows[0], assignments[0], 1, args.seed)
+            for flow in args.flows:
+                for assignment in assignments:
+                    for n in args.sizes:
+                        case = run_case(flow, assignment, n, args.seed)
+                        results['cases'].append(case)
+                        lat = case['question_latency_seconds']
+                        print(f"{flow:<10} {case['assignment']:<22} n={n:<5} {case['questions_per_second']:8.1f} q/s  "
+                              f"p50 {lat['p50']*1000:7.1f} ms  p95 {lat['p95']*1000:7.1f} ms  p99 {lat['p99']*1000:7.1f} ms  "
+                              f"peak {case['peak_memory_mb']:6.1f} MB  {case['calls_per_student']:.1f} calls/student")
+        finally:
+            os.chdir(cwd)
+
+    if out:
+        with open(out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.out}")
+    if baseline:
+        compare(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
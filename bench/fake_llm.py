@@ -0,0 +1,79 @@
+"""
+A fake LLM backend for benchmarks: no network, configurable latency and failure
+distributions. Registered as provider 'fake', so LLM(model='fake:any-name')
+exercises the real scheduler, retry and grading code paths.
+"""
+import sys
+import time
+import random
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import httpx
+import openai
+from backends import Backend, register_provider
+
+
+class FakeBackend(Backend):
+    """Returns canned grading verdicts after a log-normally distributed delay."""
+
+    # Shared configuration, set with configure()
+    median_latency = 0.002   # seconds
+    latency_sigma = 0.5      # log-normal shape; 0 for a fixed latency
+    failure_rate = 0.0       # fraction of calls that raise a retryable error
+    pass_rate = 0.7          # fraction of verdicts that end in "Correct"
+    completion_tokens = 120
+
+    _lock = threading.Lock()
+    calls = 0
+    failures = 0
+    latencies = []
+
+    def create(self, model, messages, stream=False, timeout=None, **kwargs):
+        cls = FakeBackend
+        delay = cls.median_latency * (random.lognormvariate(0, cls.latency_sigma) if cls.latency_sigma else 1)
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise openai.APITimeoutError(request=httpx.Request("POST", "http://fake/v1/chat/completions"))
+        time.sleep(delay)
+        with cls._lock:
+            cls.calls += 1
+            cls.latencies.append(delay)
+            failed = random.random() < cls.failure_rate
+            cls.failures += failed
+        if failed:
+            response = httpx.Response(429, headers={'retry-after': '0'},
+                                      request=httpx.Request("POST", "http://fake/v1/chat/completions"))
+            raise openai.RateLimitError("Fake rate limit", response=response, body=None)
+
+        verdict = "Correct" if random.random() < cls.pass_rate else "Incorrect"
+        content = "The answer applies the stated rules to this case step by step. " * 3 + verdict
+        prompt_tokens = sum(len(m['content']) for m in messages) // 4
+        usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': cls.completion_tokens,
+                 'total_tokens': prompt_tokens + cls.completion_tokens}
+        if stream:
+            return iter([SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word + " "))])
+                         for word in content.split()])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+
+def configure(**settings):
+    """Sets FakeBackend parameters (median_latency, latency_sigma, failure_rate, pass_rate) and resets counters."""
+    for name, value in settings.items():
+        if not hasattr(FakeBackend, name):
+            raise AttributeError(f"Unknown fake LLM setting '{name}'")
+        setattr(FakeBackend, name, value)
+    reset()
+
+
+def reset():
+    with FakeBackend._lock:
+        FakeBackend.calls = 0
+        FakeBackend.failures = 0
+        FakeBackend.latencies = []
+
+
+register_provider('fake', backend_class=FakeBackend, api_key_optional=True)
@@ -0,0 +1,190 @@
+"""
+Load test for concurrent Playground sessions, as served by `make serve` (Voila
+starts one kernel process per student).
+
+Starts the mock LLM server, then for each N in a ramp launches N student
+processes at once. Each process builds the assignment's Playground and clicks
+through Verify, Test on every question (several rounds, with think time) and
+Submit Assignment. The harness records feedback latency, kernel memory (RSS)
+and CPU time per student, and reports the N at which the host saturates.
+
+    python bench/loadtest.py --ramp 1 2 4 8 16 32 --latency-ms 800
+"""
+import io
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import resource
+import tempfile
+import contextlib
+import multiprocessing as mp
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def rss_mb():
+    """Current resident set size of this process."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Peak RSS: kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def student_session(student_id, assignment_path, rounds, think_time, ready, results):
+    """One simulated student in its own process, driving the notebook's widgets."""
+    import ipywidgets as widgets
+    import playground as playground_module
+
+    displayed = []
+    playground_module.display = lambda *items: displayed.extend(items)  # Capture instead of rendering
+    buttons = lambda description: [w for w in displayed if isinstance(w, widgets.Button) and w.description == description]
+
+    with open(assignment_path, 'r', encoding='utf-8') as f:
+        questions = json.load(f)['questions']
+    os.chdir(tempfile.mkdtemp(prefix="loadtest-"))  # store_final_answer writes to the working directory
+
+    latencies = []
+    cpu_start = time.process_time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        p = playground_module.Playground()
+        p.set_model('local:mock')
+        p.add_whitelist(student_id)
+        p.create_verify()
+        id_input = next(w for w in displayed if isinstance(w, widgets.Textarea))
+        id_input.value = student_id
+        buttons("Verify")[0].click()
+
+        for q in questions:
+            p.create_question(q.get('text'))
+            for i, instruction in enumerate(q.get('instructions', [])):
+                p.add_instruction(instruction, q.get('testcases') if i == 0 else None,
+                                  initial_value=f"Student {student_id}'s explanation of the rules for this question.")
+            p.displayAll()
+        p.store_final_answer()
+
+        ready.wait()  # Start clicking together once every kernel is built
+        for _ in range(rounds):
+            for test_button in buttons("Test"):
+                t = time.perf_counter()
+                test_button.click()
+                latencies.append(time.perf_counter() - t)
+                time.sleep(think_time)
+        buttons("Submit Assignment")[0].click()
+
+    results.put({'student': student_id, 'latencies': latencies, 'rss_mb': rss_mb(),
+                 'cpu_seconds': time.process_time() - cpu_start})
+
+
+def run_level(n, args):
+    """Runs N concurrent students and aggregates their measurements."""
+    ctx = mp.get_context("spawn")
+    results = ctx.Queue()
+    ready = ctx.Barrier(n + 1, timeout=300)
+    procs = [ctx.Process(target=student_session,
+                         args=(f"{n:03d}{i:04d}Student", args.assignment, args.rounds, args.think_time, ready, results))
+             for i in range(n)]
+    for proc in procs:
+        proc.start()
+    ready.wait()  # Every kernel has imported and built its widgets
+    wall_start = time.perf_counter()
+    sessions = []
+    while len(sessions) < n:
+        try:
+            sessions.append(results.get(timeout=1.0))
+        except queue.Empty:
+            failed = [proc for proc in procs if proc.exitcode not in (None, 0)]
+            if failed:
+                raise RuntimeError(f"{len(failed)} student process(es) crashed; see the traceback above.")
+    wall = time.perf_counter() - wall_start
+    for proc in procs:
+        proc.join()
+
+    latencies = [t for s in sessions for t in s['latencies']]
+    cpu = sum(s['cpu_seconds'] for s in sessions)
+    return {
+        'students': n,
+        'feedback_clicks': len(latencies),
+        'wall_seconds': wall,
+        'clicks_per_second': len(latencies) / wall,
+        'latency_p50': percentile(latencies, 50),
+        'latency_p95': percentile(latencies, 95),
+        'rss_mb_per_kernel': sum(s['rss_mb'] for s in sessions) / n,
+        'rss_mb_total': sum(s['rss_mb'] for s in sessions),
+        'cpu_utilization': cpu / (wall * (os.cpu_count() or 1)),
+    }
+
+
+def find_saturation(levels, latency_growth=1.5, min_throughput_gain=0.1):
+    """The first N where throughput stops scaling while p95 feedback latency degrades, or None."""
+    for prev, cur in zip(levels, levels[1:]):
+        gain = cur['clicks_per_second'] / prev['clicks_per_second'] - 1
+        if gain < min_throughput_gain and cur['latency_p95'] > latency_growth * levels[0]['latency_p95']:
+            return cur['students']
+        if cur['cpu_utilization'] > 0.9:
+            return cur['students']
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test concurrent Playground sessions against a mock LLM.")
+    parser.add_argument("--assignment", default=str(PROJECT_ROOT / "assignment" / "1Integer.json"))
+    parser.add_argument("--ramp", nargs="+", type=int, default=[1, 2, 4, 8, 16, 32], help="concurrent students per level")
+    parser.add_argument("--rounds", type=int, default=2, help="times each student tests every question")
+    parser.add_argument("--think-time", type=float, default=0.5, help="seconds between a student's Test clicks")
+    parser.add_argument("--latency-ms", type=float, default=500, help="mock LLM time to first byte")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--out", help="write the results as JSON")
+    args = parser.parse_args()
+
+    from mock_server import serve
+    ctx = mp.get_context("spawn")
+    server = ctx.Process(target=serve, args=(args.port, args.latency_ms / 1000), daemon=True)
+    server.start()
+    # Inherited by the student processes, which queue for the LLM together as Voila kernels do
+    os.environ['LOCAL_LLM_BASE_URL'] = f"http://127.0.0.1:{args.port}/v1"
+    os.environ['LLM_SCHEDULER_FILE'] = os.path.join(tempfile.mkdtemp(prefix="loadtest-scheduler-"), "state.json")
+    time.sleep(0.5)
+
+    levels = []
+    try:
+        for n in args.ramp:
+            level = run_level(n, args)
+            levels.append(level)
+            print(f"N={n:<4} {level['clicks_per_second']:6.2f} clicks/s  p50 {level['latency_p50']:6.2f} s  "
+                  f"p95 {level['latency_p95']:6.2f} s  RSS/kernel {level['rss_mb_per_kernel']:6.1f} MB  "
+                  f"total RSS {level['rss_mb_total']:7.1f} MB  CPU {level['cpu_utilization']:5.1%}")
+    finally:
+        server.terminate()
+
+    saturation = find_saturation(levels)
+    if saturation:
+        print(f"\nSaturation point: ~{saturation} concurrent students on this host.")
+    else:
+        print(f"\nNo saturation up to {args.ramp[-1]} concurrent students; extend --ramp to find the limit.")
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump({'settings': vars(args), 'levels': levels, 'saturation_students': saturation}, f, indent=2)
+        print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
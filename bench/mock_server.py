@@ -0,0 +1,78 @@
+"""
+A local OpenAI-compatible mock LLM server for load tests. Serves
+/v1/chat/completions (plain and streaming) with a configurable delay, so the
+real OpenAI client, connection pool and streaming code paths are exercised.
+
+    python bench/mock_server.py --port 8765 --latency-ms 800
+    LOCAL_LLM_BASE_URL=http://127.0.0.1:8765/v1  ... set_model('local:mock')
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = ("The answer applies the stated rules to this test case step by step, "
+         "so the conversion works out as expected. Correct")
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    latency = 0.5        # seconds before the first byte
+    token_delay = 0.005  # seconds between streamed chunks
+    requests = 0
+    _lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass  # Keep the console quiet under load
+
+    def do_POST(self):
+        if not self.path.endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b"{}")
+        with MockHandler._lock:
+            MockHandler.requests += 1
+        time.sleep(random.uniform(0.5, 1.5) * self.latency)
+        created = int(time.time())
+        model = body.get('model', 'mock')
+        if body.get('stream'):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.end_headers()
+            for word in REPLY.split():
+                chunk = {'id': 'mock', 'object': 'chat.completion.chunk', 'created': created, 'model': model,
+                         'choices': [{'index': 0, 'delta': {'content': word + " "}, 'finish_reason': None}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                time.sleep(self.token_delay)
+            self.wfile.write(b"data: [DONE]\n\n")
+            return
+        prompt_tokens = sum(len(m.get('content', '')) for m in body.get('messages', [])) // 4
+        response = {'id': 'mock', 'object': 'chat.completion', 'created': created, 'model': model,
+                    'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': REPLY}, 'finish_reason': 'stop'}],
+                    'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': 30, 'total_tokens': prompt_tokens + 30}}
+        payload = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def serve(port=8765, latency=0.5, token_delay=0.005):
+    MockHandler.latency = latency
+    MockHandler.token_delay = token_delay
+    server = ThreadingHTTPServer(("127.0.0.1", port), MockHandler)
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI-compatible mock LLM server.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=500)
+    parser.add_argument("--token-delay-ms", type=float, default=5)
+    args = parser.parse_args()
+    print(f"Mock LLM listening on http://127.0.0.1:{args.port}/v1")
+    serve(args.port, args.latency_ms / 1000, args.token_delay_ms / 1000)
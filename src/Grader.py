@@ -1,20 +1,47 @@
 from LLM import *
+from submissions import iter_upload, prefetch
+from results import ResultWriter
+from profiling import profiler
+from progress import progress
+from logs import context, log
+from breaker import CircuitOpen
 import ipywidgets as widgets
 from IPython.display import display
 import json
 import time
+import hashlib
+
+def fingerprint(*parts):
+  """Stable short hash of JSON-serializable values, used to detect changed questions and answers."""
+  return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()[:16]
 
 class Grader:
   def __init__(self):
     self._student_answers = {}
+    self._seen_uploads = set() # (name, content hash) of files already ingested from the upload widget
+    self._upload_digests = {} # student_id -> content hash of the ingested submission
     self._model = "gpt-4o-mini"
     self.llm = LLM(model=self._model)
     self._master_questions = {} # To store the authoritative questions
     self.final_results = {}
+    self._fingerprints = {} # q_id -> {'question': hash, 'testcases': {testcase: hash}}
+    self.previous_results = {} # Earlier grading_results, reused cell by cell when nothing changed
+    self.results_path = 'grading_results.json'
+    self.pack_conceptual = False # Grade all testcase-free questions of a submission in one request
+    self.prefetch = 8 # Submissions decoded ahead of the one being graded
+    self.keep_results = True # Also keep results in final_results; grade.py streams them to disk only
 
   def set_model(self, model):
     self._model = model
-    self.llm = LLM(model=self._model)
+    self.llm.set_model(model)
+
+  def load_previous_results(self, results_path='grading_results.json'):
+    """Loads earlier results so that regrading only re-evaluates what changed."""
+    try:
+      with open(results_path, 'r', encoding='utf-8') as f:
+        self.previous_results = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+      self.previous_results = {}
 
   def load_assignment(self, assignment_path):
     """Loads the master question file as the source of truth."""
@@ -25,66 +52,213 @@ class Grader:
             for q in data.get('questions', []):
                 q_id = f"q{q['id']}"
                 self._master_questions[q_id] = q
-        print(f"Successfully loaded assignment template from: {assignment_path}")
+                instructions = q.get('instructions', [])
+                self._fingerprints[q_id] = {
+                  'question': fingerprint(instructions, q.get('testcases', []), q.get('token_budget')),
+                  'testcases': {tc: fingerprint(instructions, tc, q.get('token_budget')) for tc in q.get('testcases', [])}
+                }
+        log.info(f"Successfully loaded assignment template from: {assignment_path}")
     except Exception as e:
-        print(f"Error loading assignment file: {e}")
+        log.error(f"Error loading assignment file: {e}")
 
   def create_upload_button(self):
-    upload_widget = widgets.FileUpload(accept='.json', description='Upload Answers', multiple=True)
+    """Accepts answers_*.json files or a ZIP/tar of them. Re-uploads only ingest what changed."""
+    upload_widget = widgets.FileUpload(accept='.json,.zip,.tar,.tgz,.gz,.bz2,.xz', description='Upload Answers', multiple=True)
     def handle_upload(change):
-      self._student_answers.clear()
       for file_info in upload_widget.value:
-        content = file_info['content'].tobytes()
-        student_id = file_info["name"]
-        self._student_answers[student_id] = json.loads(content.decode('utf-8'))
-        print(f"Uploaded: {student_id}")
+        data = file_info['content'].tobytes()
+        key = (file_info['name'], hashlib.sha256(data).hexdigest()) # A changed archive can keep its size
+        if key in self._seen_uploads:
+          continue # Already ingested by an earlier upload event
+        self._seen_uploads.add(key)
+        self.add_upload(file_info['name'], data)
     upload_widget.observe(handle_upload, names='value')
     display(upload_widget)
 
-  def grade(self):
-    """Grades all uploaded student answers against the master assignment."""
+  def add_upload(self, name, data):
+    """Registers the submissions in one uploaded file without decoding them for grading."""
+    for submission in iter_upload(name, data):
+      if self._upload_digests.get(submission.student_id) == submission.digest:
+        continue # Unchanged re-upload
+      self._upload_digests[submission.student_id] = submission.digest
+      self._student_answers[submission.student_id] = submission
+      log.info(f"Uploaded: {submission.student_id}")
+
+  def grade(self, merge=False):
+    """
+    Grades all uploaded student answers against the master assignment. Returns the
+    IDs of the students whose results were written; students skipped because their
+    submission could not be read or the LLM was unavailable are left out.
+    """
+    graded = set()
     if not self._student_answers:
-      print("No student answers uploaded.")
-      return
+      log.warning("No student answers uploaded.")
+      return graded
     if not self._master_questions:
-      print("No master assignment file loaded. Please load one first.")
-      return
+      log.warning("No master assignment file loaded. Please load one first.")
+      return graded
+
+    items_per_student = sum(self._work_items(q_id) for q_id in self._master_questions)
+    progress.reset(total=items_per_student * len(self._student_answers), students=len(self._student_answers))
+
+    # Results are written as each student completes; the file is finalized even if grading is interrupted
+    with ResultWriter(self.results_path, merge=merge) as writer:
+      submissions = prefetch(self._student_answers.items(), self.prefetch)
+      while True:
+        with profiler.stage('file_load'):
+          student_id, student_submission, error = next(submissions, (None, None, None))
+        if student_id is None:
+          break
+        with context(student=student_id):
+          log.info(f"\n--- Grading student: {student_id} ---")
+          if error is not None:
+            log.warning(f"Skipping {student_id}: could not read submission ({error})")
+            writer.complete = False # Keep their earlier result, if any
+            progress.student_done(items_per_student)
+            continue
+          try:
+            with profiler.stage('grade_student', student=student_id):
+              result = self.grade_submission(student_submission, self.previous_results.get(student_id))
+          except CircuitOpen as e:
+            # Every remaining student would fail the same way; stop instead of waiting on a dead upstream
+            log.error(f"{e} Stopping; the students graded so far are saved, rerun with --regrade to continue.")
+            writer.complete = False
+            break
+          except ConnectionError as e:
+            log.error(f"Could not grade {student_id}: {e} Rerun with --regrade to grade the students left out.")
+            writer.complete = False
+            progress.student_done()
+            continue
+          except (KeyError, TypeError, ValueError) as e:
+            # A malformed submission, e.g. a question without an 'answers' list, must not stop the run
+            log.warning(f"Skipping {student_id}: malformed submission ({type(e).__name__}: {e})")
+            writer.complete = False # Keep their earlier result, if any
+            progress.student_done(items_per_student)
+            continue
+        progress.student_done(items_per_student - sum(self._work_items(q_id) for q_id in result))
+        with profiler.stage('result_write'):
+          writer.add(student_id, result)
+        graded.add(student_id)
+        if self.keep_results:
+          self.final_results[student_id] = result
+
+    log.info("\n--- Grading Complete ---")
+    if self.llm.prescreen is not None:
+      self.llm.prescreen.print_report()
+    log.info(f"Grading results saved to {self.results_path}")
+    return graded
+
+  def _work_items(self, q_id):
+    """Progress units for grading one question: one per test case, or one for a conceptual question."""
+    return len(self._master_questions[q_id].get('testcases', [])) or 1
+
+  def _grading_config(self):
+    """Hash of the settings besides the model that decide a verdict: ensemble and quorum, pre-screen and fallback."""
+    llm = self.llm
+    ensemble = [f"{member.provider}:{member.model}" for member in llm.ensemble]
+    screen = llm.prescreen
+    screening = None if screen is None or screen.audit else (screen.placeholder_threshold, screen.copy_threshold,
+                                                              screen.match_threshold, screen.known_bad)
+    fallback = f"{llm.fallback.provider}:{llm.fallback.model}" if llm.fallback else None
+    return fingerprint(ensemble, llm.quorum if ensemble else None, screening, fallback)
+
+  def _reusable(self, q_id, student_content, previous):
+    """The previous result for q_id if it was graded from the same answer with the same model and settings, else None."""
+    prev = (previous or {}).get(q_id)
+    if (prev and prev.get('answer_hash') == fingerprint(student_content['answers']) and prev.get('model') == self.llm.model
+        and prev.get('config') == self._grading_config()):
+      return prev
+    return None
 
-    for student_id, student_submission in self._student_answers.items():
-      print(f"\n--- Grading student: {student_id} ---")
-      result = {}
-      for q_id, student_content in student_submission.items():
+  def grade_submission(self, student_submission, previous=None):
+    """
+    Grades one student's submission, returning {q_id: result}. Given the
+    student's previous results, (question, testcase) cells whose question
+    fingerprint and answer are unchanged reuse their stored verdicts.
+    """
+    result = {}
+    packed = {}
+    packed_degraded = set()
+    if self.pack_conceptual:
+      conceptual = [(q_id, self._master_questions[q_id].get('instructions', []), content['answers'],
+                     self._master_questions[q_id].get('token_budget'), self._master_questions[q_id].get('reference_answers'),
+                     self._master_questions[q_id].get('bad_answers'))
+                    for q_id, content in student_submission.items()
+                    if q_id in self._master_questions and not self._master_questions[q_id].get('testcases')
+                    and not self._reusable(q_id, content, previous)]
+      if len(conceptual) > 1:
+        with degraded_answers() as packed_degraded:
+          packed = self.llm.grade_conceptual_questions(conceptual, stream=False)
+
+    for q_id, student_content in student_submission.items():
+      with context(question=q_id):
         if q_id not in self._master_questions:
-            print(f"Warning: Question {q_id} from student submission not found in master assignment. Skipping.")
+            log.warning(f"Warning: Question {q_id} from student submission not found in master assignment. Skipping.")
             continue
 
-        print(f"--- Grading question: {q_id} ---")
+        log.info(f"--- Grading question: {q_id} ---")
 
         master_question = self._master_questions[q_id]
         student_answers = student_content['answers']
+        fingerprints = self._fingerprints[q_id]
+        reusable = self._reusable(q_id, student_content, previous)
 
         # Use master instructions and testcases, NOT student-submitted ones
         instructions = master_question.get('instructions', [])
         testcases = master_question.get('testcases', [])
 
-        if testcases: # It's a single-instruction question with test cases
-            time, rates, avg, history = self.llm.grade_one_question(instructions, student_answers, testcases, stream=False)
-        else: # It's a multi-part conceptual question
-            time, rates, avg, history = self.llm.grade_multiple_question(instructions, student_answers, stream=False)
+        token_budget = master_question.get('token_budget') # Optional per-question override
+        # Optional example answers for the pre-screen
+        references, bad_answers = master_question.get('reference_answers'), master_question.get('bad_answers')
+        cells = {}
 
-        result[q_id] = {'time': time, 'rates': rates, 'avg_rates': avg, 'test_history': history}
-      self.final_results[student_id] = result
+        # Answers from the fallback model or the response cache are recorded under a different model,
+        # so that --regrade grades them again with the real one
+        with degraded_answers() as degraded:
+          if testcases: # It's a single-instruction question with test cases
+              previous_cells = reusable.get('cells', {}) if reusable else {}
+              reused = {tc: previous_cells[fingerprints['testcases'][tc]] for tc in testcases
+                        if fingerprints['testcases'][tc] in previous_cells}
+              time, rates, avg, history = self.llm.grade_one_question(instructions, student_answers, testcases, stream=False,
+                                                                      token_budget=token_budget, cells=reused,
+                                                                      references=references, bad_answers=bad_answers)
+              cells = {fingerprints['testcases'][tc]: {'testcase': tc, **reused[tc]} for tc in testcases}
+          elif reusable and reusable.get('fingerprint') == fingerprints['question']:
+              log.info(f"--- {q_id} unchanged, reusing previous feedback ---")
+              time, rates, avg, history = reusable['time'], reusable['rates'], reusable['avg_rates'], reusable['test_history']
+          elif q_id in packed: # Already graded together with the student's other conceptual questions
+              time, rates, avg, history = packed[q_id]
+              degraded |= packed_degraded
+          else: # It's a multi-part conceptual question
+              time, rates, avg, history = self.llm.grade_multiple_question(instructions, student_answers, stream=False, token_budget=token_budget,
+                                                                           references=references, bad_answers=bad_answers)
 
-    print("\n--- Grading Complete ---")
-    self.output_score()
+        progress.advance(self._work_items(q_id))
+        result[q_id] = {'time': time, 'rates': rates, 'avg_rates': avg, 'test_history': history,
+                        'fingerprint': fingerprints['question'], 'answer_hash': fingerprint(student_answers),
+                        'model': f"{self.llm.model} (degraded: {', '.join(sorted(degraded))})" if degraded else self.llm.model,
+                        'config': self._grading_config(), 'cells': cells}
+    return result
 
-  def output_score(self):
-    output_filename = 'grading_results.json'
-    with open(output_filename, 'w', encoding='utf-8') as f:
-      json.dump(self.final_results, f, indent=4)
-    print(f"Grading results saved to {output_filename}")
+  def output_score(self, merge=False):
+    """Writes final_results; with merge=True, results are folded into the existing file instead of replacing it."""
+    with profiler.stage('result_write'), ResultWriter(self.results_path, merge=merge) as writer:
+      for student_id, result in self.final_results.items():
+        writer.add(student_id, result)
+    log.info(f"Grading results saved to {self.results_path}")
 
   def run(self):
     button = widgets.Button(description='Start Grading', button_style='success')
-    button.on_click(lambda x: self.grade())
-    display(button)
+    bar = widgets.IntProgress(value=0, min=0, max=1, description='Progress:')
+    status = widgets.Label()
+
+    def show(s):
+      bar.max, bar.value = max(1, s['total']), s['completed']
+      status.value = progress.format_status(s)
+
+    def start(b):
+      with progress.report(callback=show):
+        self.grade()
+
+    button.on_click(start)
+    display(button, bar, status)
@@ -1,59 +1,303 @@
-from openai import OpenAI
 import time
-import os
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from dotenv import load_dotenv
 
-# Load environment variables from a .env file
+# Load environment variables from a .env file, before any module below reads them
 load_dotenv()
 
+from scheduler import BATCH, get_scheduler
+from prompts import (ANSWER_TOKEN_BUDGET, build_compare_prompt, build_feedback_prompt, build_packed_feedback_prompt,
+                     build_testcase_prompt, estimate_tokens, parse_compare_verdicts, parse_verdict, split_packed_feedback)
+from backoff import LatencyTracker, backoff_delay, is_retryable, retry_after
+from backends import get_backend, parse_model
+from profiling import profiler
+from progress import progress
+from logs import context, log
+from breaker import CircuitOpen, get_breaker, responses
+
+# Shared by all LLM instances to run hedged (duplicate) requests
+_hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-hedge")
+# Shared by all LLM instances to query the models of an ensemble concurrently
+_ensemble_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-ensemble")
+# Set of answers that came from a fallback model or the response cache, while degraded_answers() is active
+_degraded = contextvars.ContextVar("degraded_answers", default=None)
+
+@contextmanager
+def degraded_answers():
+  """
+  Collects, for the calls made in this block, which answers did not come from the
+  model itself: 'fallback provider:model' or 'cached provider:model'. Empty when
+  every call was answered normally.
+  """
+  token = _degraded.set(set())
+  try:
+    yield _degraded.get()
+  finally:
+    _degraded.reset(token)
+
 class LLM:
-  def __init__(self, model="gpt-4o-mini") -> None:
-    self.api_key = os.getenv("OPENAI_API_KEY")
-    if not self.api_key:
-        raise ValueError("OPENAI_API_KEY environment variable not set.")
-    self.model = model
-    self.client = OpenAI(api_key=self.api_key)
-
-  def chat_completion_openai(self, prompt, retries=3, stream=False, usageInfo=False):
-        """Makes a call to the OpenAI API and handles retries."""
+  def __init__(self, model="gpt-4o-mini", base_url=None) -> None:
+    self.set_model(model, base_url)
+    self.timeout = 60.0   # Seconds allowed for a single request attempt
+    self.deadline = 180.0 # Seconds allowed for a whole call, including retries and backoff
+    self.hedge = False    # Send a duplicate request when the first is slower than the recent p95
+    self.token_budget = ANSWER_TOKEN_BUDGET # Tokens of student text allowed into one question's prompt
+    self.prescreen = None # Optional prescreen.PreScreen run before any LLM call for a question
+    self.ensemble = []    # Models that vote on each test case instead of this one; see set_ensemble
+    self.fallback = None  # LLM answering while this model's circuit breaker is open; see set_fallback
+    self.output = None    # File-like object to write messages to instead of logging them, e.g. to capture background grading
+    self.quorum = None
+    # Scheduling context: Playground marks its calls interactive and tags them with the student ID
+    self.priority = BATCH
+    self.student_id = None
+
+  def set_model(self, model, base_url=None):
+    """
+    Switches model, e.g. 'gpt-4o', 'gemini-1.5-flash' or 'local:llama3'. The
+    pooled client is looked up on the first call, so an LLM that is only used
+    for planning or token counting needs no API key.
+    """
+    self.provider, self.model = parse_model(model)
+    self.base_url = base_url
+    self._backend = None
+    self.latency = LatencyTracker() # Latencies of the previous model say nothing about this one
+
+  @property
+  def backend(self):
+    if self._backend is None:
+        self._backend = get_backend(self.provider, self.base_url)
+    return self._backend
+
+  @property
+  def api_key(self):
+    return self.backend.api_key
+
+  def connect(self):
+    """Looks up the clients of this model, its ensemble and fallback now; raises ValueError if an API key is missing."""
+    for llm in [self, *self.ensemble, *([self.fallback] if self.fallback else [])]:
+        llm.backend
+
+  def _log(self, level, message, **fields):
+    if self.output is not None:
+        print(message, file=self.output)
+    else:
+        log.log(level, message, extra={'fields': fields} if fields else None)
+
+  def set_fallback(self, model):
+    """Answers with `model` (e.g. 'gemini-1.5-flash') while this model's circuit is open; None turns it off."""
+    self.fallback = LLM(model) if model else None
+
+  def set_ensemble(self, models, quorum=None):
+    """
+    Evaluates test cases with several models at once, e.g. ['gpt-4o', 'gpt-3.5-turbo', 'gemini-1.5-flash'].
+    A verdict stands as soon as `quorum` of them agree (default: a majority). An empty list turns it off.
+    """
+    self.ensemble = [LLM(model) for model in models]
+    self.quorum = quorum or len(models) // 2 + 1
+    if self.ensemble and not 1 <= self.quorum <= len(self.ensemble):
+        raise ValueError(f"Quorum must be between 1 and {len(self.ensemble)}, got {self.quorum}.")
+
+  def chat_completion_openai(self, prompt, retries=3, stream=False, usageInfo=False, deadline=None, use_cache=True, cancel=None):
+        """
+        Makes a call to the model's backend through the shared scheduler and handles retries.
+        While the model's circuit breaker is open, the call fails fast with CircuitOpen
+        unless the fallback model or (with use_cache) a cached response for the same
+        prompt can answer; such answers are reported to degraded_answers(). cancel is
+        an optional threading.Event for Scheduler.abandon.
+        """
+        name = f"{self.backend.provider}:{self.model}"
+        breaker = get_breaker(name)
+        tokens = estimate_tokens(prompt, self.model)
+        start = time.monotonic()
+        try:
+            breaker.allow()
+            with get_scheduler().slot(self.priority, self.student_id, tokens, cancel=cancel):
+                result = self._chat_completion_with_retries(prompt, retries, stream, usageInfo, deadline or self.deadline, breaker)
+        except CircuitOpen as e:
+            return self._fallback_completion(prompt, retries, stream, usageInfo, deadline, use_cache, e)
+        responses.put(name, prompt, result[0] if usageInfo else result)
+        progress.record_call(tokens)
+        log.debug("LLM call completed", extra={'fields': {'model': f"{self.backend.provider}:{self.model}", 'prompt_tokens': tokens,
+                                                           'seconds': round(time.monotonic() - start, 3), 'stream': stream}})
+        return result
+
+  def _fallback_completion(self, prompt, retries, stream, usageInfo, deadline, use_cache, error):
+        """Answers a call whose circuit is open from the fallback model, else the response cache, else re-raises."""
+        degraded = _degraded.get()
+        if self.fallback is not None:
+            fallback = self.fallback
+            fallback.priority, fallback.student_id, fallback.timeout, fallback.output = self.priority, self.student_id, self.timeout, self.output
+            name = f"{fallback.backend.provider}:{fallback.model}"
+            try:
+                result = fallback.chat_completion_openai(prompt, retries, stream, usageInfo, deadline, use_cache)
+                self._log(logging.WARNING, f"{error} Answered by fallback model {name}.", fallback=name)
+                if degraded is not None:
+                    degraded.add(f"fallback {name}")
+                return result
+            except (CircuitOpen, ConnectionError):
+                pass
+        name = f"{self.backend.provider}:{self.model}"
+        cached = responses.get(name, prompt) if use_cache else None
+        if cached is not None:
+            self._log(logging.WARNING, f"{error} Using a cached response to the same prompt.", fallback="cache")
+            if degraded is not None:
+                degraded.add(f"cached {name}")
+            if stream:
+                self._log(logging.INFO, cached)
+            return (cached, {}, [0.0]) if usageInfo else cached
+        raise error
+
+  def _create_completion(self, prompt, stream, timeout):
+        return self.backend.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.7, # Slightly lower temp for more consistent grading
+            stream=stream,
+            timeout=timeout
+        )
+
+  def _hedged_completion(self, prompt, timeout):
+        """Sends a duplicate request if the first one is slower than the recent p95; the first response wins."""
+        delay = self.latency.percentile(95) if self.hedge else None
+        if delay is None:
+            return self._create_completion(prompt, False, timeout)
+        pending = [_hedge_pool.submit(self._create_completion, prompt, False, timeout)]
+        done, _ = wait(pending, timeout=delay)
+        if not done:
+            pending.append(_hedge_pool.submit(self._create_completion, prompt, False, timeout))
+        while True:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.remove(future)
+                # The loser keeps running in the background; its result is simply dropped
+                if future.exception() is None or not pending:
+                    return future.result()
+
+  def _chat_completion_with_retries(self, prompt, retries, stream, usageInfo, deadline, breaker):
         last_exception = None
+        expires = time.monotonic() + deadline
         for i in range(retries):
+            remaining = expires - time.monotonic()
+            if remaining <= 0:
+                break
             try:
                 t1 = time.time()
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0.7, # Slightly lower temp for more consistent grading
-                    stream=stream
-                )
+                with profiler.stage('network', model=self.model, attempt=i + 1, stream=stream):
+                    if not stream:
+                        response = self._hedged_completion(prompt, min(self.timeout, remaining))
+                    else:
+                        response = self._create_completion(prompt, True, min(self.timeout, remaining))
+                        # Handle streaming response, showing it a line at a time rather than per chunk
+                        complete_response = ""
+                        pending = ""
+                        for chunk in response:
+                            if chunk.choices[0].delta.content is not None:
+                                complete_response += chunk.choices[0].delta.content
+                                pending += chunk.choices[0].delta.content
+                                if "\n" in pending:
+                                    lines, pending = pending.rsplit("\n", 1)
+                                    self._log(logging.INFO, lines)
+                        if pending.strip():
+                            self._log(logging.INFO, pending)
+                        breaker.record(False, time.time() - t1)
+                        return complete_response.strip()
                 total_time = time.time() - t1
+                breaker.record(False, total_time)
 
-                if not stream:
-                    content = response.choices[0].message.content.strip()
-                    if usageInfo:
-                        return content, dict(response.usage), [total_time]
-                    return content
-                else:
-                    # Handle streaming response
-                    complete_response = ""
-                    for chunk in response:
-                        if chunk.choices[0].delta.content is not None:
-                            complete_response += chunk.choices[0].delta.content
-                            print(chunk.choices[0].delta.content, end='', flush=True) # Stream to console
-                    print("\n") # Newline after streaming is done
-                    return complete_response.strip()
+                self.latency.record(total_time)
+                content = response.choices[0].message.content.strip()
+                if usageInfo:
+                    return content, dict(response.usage), [total_time]
+                return content
 
             except Exception as e:
                 last_exception = e
-                if "rate limit" in str(e).lower():
-                    print(f"Rate limit hit. Retrying in {2**i} seconds...")
-                    time.sleep(2**i)
-                else:
-                    print(f"An unexpected error occurred: {e}")
-                    break # Don't retry on non-rate-limit errors
+                if not is_retryable(e):
+                    breaker.record(False) # The backend answered; the request itself was bad
+                    self._log(logging.ERROR, f"An unexpected error occurred: {e}")
+                    break # Don't retry permanent errors (bad request, auth, ...)
+                # A rate limit means the backend is up and answering; the scheduler deals with those
+                breaker.record(getattr(e, 'status_code', None) != 429)
+                if breaker.is_open:
+                    progress.record_failure()
+                    breaker.allow() # Raises CircuitOpen: stop retrying a backend that is down
+                if i == retries - 1:
+                    break
+                delay = retry_after(e)
+                delay = backoff_delay(i) if delay is None else delay
+                if delay >= expires - time.monotonic():
+                    self._log(logging.WARNING, f"Transient error ({type(e).__name__}), but retrying would exceed the {deadline:.0f}s deadline.")
+                    break
+                self._log(logging.WARNING, f"Transient error ({type(e).__name__}). Retrying in {delay:.1f} seconds...",
+                          error=type(e).__name__, attempt=i + 1, delay=round(delay, 2))
+                progress.record_retry(e)
+                with profiler.stage('retry_backoff', error=type(e).__name__):
+                    time.sleep(delay)
+
+        progress.record_failure()
+        raise ConnectionError(f"Failed to get response from {self.backend.provider} after {retries} retries.") from last_exception
+
+
+  def _quorum_evaluation(self, prompt, use_cache=True):
+    """
+    Sends a test case prompt to every ensemble model concurrently and returns
+    (passed, evaluation, votes) once `quorum` verdicts agree. Requests that have
+    not started are cancelled; ones already in flight are abandoned rather than
+    awaited, and their scheduler slots are freed for other requests at once.
+    votes maps each model to Correct, Incorrect, no verdict, error or cancelled.
+    Without a quorum, the majority of the verdicts received decides.
+    """
+    futures = {}
+    cancels = {}
+    for member in self.ensemble:
+        member.priority, member.student_id, member.timeout, member.deadline = self.priority, self.student_id, self.timeout, self.deadline
+        member.output = self.output
+        cancel = threading.Event()
+        # Each request runs in a copy of this context, so its log records keep the student and test case
+        future = _ensemble_pool.submit(contextvars.copy_context().run, member.chat_completion_openai, prompt,
+                                       use_cache=use_cache, cancel=cancel)
+        futures[future], cancels[future] = f"{member.backend.provider}:{member.model}", cancel
 
-        raise ConnectionError(f"Failed to get response from OpenAI after {retries} retries.") from last_exception
+    votes = {}
+    evaluations = []
+    tally = {True: 0, False: 0}
+    decided = None
+    pending = set(futures)
+    while pending and decided is None and max(tally.values()) + len(pending) >= self.quorum:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            model = futures[future]
+            try:
+                evaluation = future.result()
+            except Exception as e:
+                votes[model] = "error"
+                self._log(logging.WARNING, f"{model} failed during ensemble grading: {e}")
+                continue
+            verdict = parse_verdict(evaluation)
+            votes[model] = {True: "Correct", False: "Incorrect", None: "no verdict"}[verdict]
+            evaluations.append(f"[{model}]\n{evaluation}")
+            if verdict is not None:
+                tally[verdict] += 1
+                if tally[verdict] >= self.quorum and decided is None:
+                    decided = verdict
 
+    for future in pending:
+        future.cancel()
+        get_scheduler().abandon(cancels[future])
+        votes[futures[future]] = "cancelled"
+    if decided is None:
+        if not any(tally.values()):
+            raise ConnectionError("No model in the ensemble returned a verdict.")
+        decided = tally[True] > tally[False] # A tie does not pass
+        evaluations.append(f"No quorum of {self.quorum}; decided by the majority of {sum(tally.values())} verdicts.")
+    summary = ", ".join(f"{model}: {vote}" for model, vote in votes.items())
+    self._log(logging.INFO, f"Votes: {summary}", votes=votes)
+    evaluations.append(f"Votes: {summary}\n{'Correct' if decided else 'Incorrect'}")
+    return decided, "\n\n".join(evaluations), votes
 
   def compare(self, llm_answer, correct_answer_fragment):
     """Compares an LLM's generated answer with an expected fragment."""
@@ -62,89 +306,201 @@ class LLM:
     verification_history = prompt + "\n" + out
     return "yes" in out.lower(), verification_history
 
-  def grade_one_question(self, instructions, student_answer, testcases, threshold=0.5, stream=False):
-    """Grades a single-instruction question against multiple test cases."""
+  def compare_many(self, items, llm_answer=None, batch_size=10, max_workers=4):
+    """
+    Batched compare: checks many concept fragments in one structured request
+    per batch_size items, running the batches concurrently. items are fragments
+    checked against llm_answer, or (answer, fragment) pairs when llm_answer is
+    None. Returns ([bool per item], verification_history). Items a response has
+    no verdict for are checked on their own with compare().
+    """
+    pairs = [(llm_answer, item) for item in items] if llm_answer is not None else list(items)
+    if not pairs:
+        return [], ""
+    batches = [pairs[i:i + batch_size] for i in range(0, len(pairs), batch_size)]
+
+    def check(batch):
+        prompt = build_compare_prompt(batch)
+        out = self.chat_completion_openai(prompt)
+        with profiler.stage('parse'):
+            verdicts = parse_compare_verdicts(out, len(batch))
+        history = prompt + "\n" + out
+        for index, (answer, fragment) in enumerate(batch):
+            if index not in verdicts:
+                verdicts[index], single_history = self.compare(answer, fragment)
+                history += "\n\n" + single_history
+        return [verdicts[index] for index in range(len(batch))], history
+
+    if len(batches) == 1:
+        results = [check(batches[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(batches)), thread_name_prefix="llm-compare") as pool:
+            results = list(pool.map(check, batches))
+    verdicts = [verdict for batch_verdicts, _ in results for verdict in batch_verdicts]
+    return verdicts, "\n\n".join(history for _, history in results)
+
+  def _screen(self, instructions, answers, references, bad_answers):
+    """The pre-screen verdict for an answer, or None when pre-screening is off."""
+    if self.prescreen is None:
+        return None
+    with profiler.stage('prescreen'):
+        verdict = self.prescreen.screen(instructions, answers, references or (), bad_answers or ())
+    if verdict.action:
+        self._log(logging.INFO, str(verdict), prescreen=verdict.action)
+    return verdict
+
+  def grade_one_question(self, instructions, student_answer, testcases, threshold=0.5, stream=False, token_budget=None, cells=None,
+                         references=None, bad_answers=None):
+    """
+    Grades a single-instruction question against multiple test cases.
+    cells, if given, maps testcase -> {'rate', 'history'}: test cases already in it
+    are reused without calling the LLM, and newly graded ones are added to it.
+    references and bad_answers are example answers for the pre-screen, if enabled.
+    """
     test_history = ""
     rates = []
-    student_full_answer = f"The student's explanation is: '{student_answer[0]}'. "
     instruction_text = instructions[0]
+    budget = token_budget or self.token_budget
+    cells = {} if cells is None else cells
     start_time = time.time()
 
-    print(f"--- Evaluating Question: {instruction_text} ---")
+    self._log(logging.INFO, f"--- Evaluating Question: {instruction_text} ---")
+    verdict = self._screen(instructions, student_answer, references, bad_answers)
+    if verdict and verdict.action:
+        test_history += f"{verdict}\n\n"
+    if verdict and verdict.action == 'reject' and not self.prescreen.audit:
+        for testcase in testcases:
+            cells[testcase] = {'rate': 0.0, 'history': f"{verdict}\n\n"}
+        self._log(logging.INFO, f"Success Rate: 0.00. Does not meet threshold of {threshold}. Please revise your answer.")
+        return time.time() - start_time, [0.0] * len(testcases), 0.0, test_history + f"Overall Result: Not Accepted (Threshold: {threshold})"
+
     for i, testcase in enumerate(testcases):
-        print(f"\n========== Test Case {i+1}: '{testcase}' ==========")
-        prompt = f"""
-        You are a teaching assistant evaluating a student's answer to a computer science question.
+        with context(testcase=testcase):
+            self._log(logging.INFO, f"\n========== Test Case {i+1}: '{testcase}' ==========")
+            if testcase in cells:
+                self._log(logging.INFO, f"--- Test Case {i+1} unchanged, reusing previous verdict ({cells[testcase]['rate']:.2f}) ---")
+                test_history += cells[testcase]['history']
+                rates.append(cells[testcase]['rate'])
+                continue
 
-        Question instruction: "{instruction_text}"
-        Student's answer: "{student_full_answer}"
+            with profiler.stage('prompt_build'):
+                prompt, notice = build_testcase_prompt(instruction_text, student_answer[0], testcase, budget, self.model)
+            if notice and i == 0:
+                self._log(logging.INFO, notice)
+                test_history += notice + "\n\n"
+            cell_history = f"Prompt for test case '{testcase}':\n{prompt}\n\n"
 
-        Your task is to determine if the student's answer correctly applies to the following test case: "{testcase}".
+            success = 0
+            attempts = 0
+            votes = []
+            for j in range(3): # Retry up to 3 times for consistency
+                attempts += 1
+                # A cached answer is the same every time, so only the first attempt may use one
+                if self.ensemble:
+                    passed, llm_evaluation, attempt_votes = self._quorum_evaluation(prompt, use_cache=j == 0)
+                    votes.append(attempt_votes)
+                else:
+                    try:
+                        llm_evaluation = self.chat_completion_openai(prompt, stream=stream, use_cache=j == 0)
+                    except CircuitOpen:
+                        if j == 0:
+                            raise
+                        attempts -= 1 # Keep the verdicts so far rather than repeating a cached one
+                        break
+                    with profiler.stage('parse'):
+                        passed = parse_verdict(llm_evaluation) is True # Check the end of the response
+                cell_history += f"Attempt {j+1} Evaluation:\n{llm_evaluation}\n\n"
 
-        Think step-by-step and provide a brief explanation of why the student's answer succeeds or fails for this specific test case. Conclude your entire response with a single word: "Correct" if it succeeds, or "Incorrect" if it fails.
-        """
-        test_history += f"Prompt for test case '{testcase}':\n{prompt}\n\n"
-
-        success = 0
-        attempts = 0
-        for j in range(3): # Retry up to 3 times for consistency
-            attempts += 1
-            llm_evaluation = self.chat_completion_openai(prompt, stream=stream)
-            test_history += f"Attempt {j+1} Evaluation:\n{llm_evaluation}\n\n"
-
-            if "correct" in llm_evaluation.lower()[-20:]: # Check the end of the response
-                print(f"--- Test Case {i+1} Passed ---")
-                success += 1
-                break
-            else:
-                if j == 2:
-                    print(f"--- Test Case {i+1} Failed ---")
+                if passed:
+                    self._log(logging.INFO, f"--- Test Case {i+1} Passed ---", passed=True, attempts=attempts)
+                    success += 1
+                    break
+                else:
+                    if j == 2:
+                        self._log(logging.INFO, f"--- Test Case {i+1} Failed ---", passed=False, attempts=attempts)
 
-        rate = float(success) / attempts
-        rates.append(rate)
+            rate = float(success) / attempts
+            rates.append(rate)
+            test_history += cell_history
+            cells[testcase] = {'rate': rate, 'history': cell_history}
+            if votes:
+                cells[testcase]['votes'] = votes
 
     end_time = time.time()
     avg_rate = sum(rates) / len(rates) if rates else 0
+    if verdict:
+        self.prescreen.record(verdict, avg_rate >= threshold)
 
-    print(f"\n--- Final Result ---")
+    self._log(logging.INFO, f"\n--- Final Result ---")
     if avg_rate >= threshold:
-        print(f"Success Rate: {avg_rate:.2f}. Your answer is accepted.")
+        self._log(logging.INFO, f"Success Rate: {avg_rate:.2f}. Your answer is accepted.", avg_rate=avg_rate, accepted=True)
         test_history += "\nOverall Result: Accepted"
     else:
-        print(f"Success Rate: {avg_rate:.2f}. Does not meet threshold of {threshold}. Please revise your answer.")
+        self._log(logging.INFO, f"Success Rate: {avg_rate:.2f}. Does not meet threshold of {threshold}. Please revise your answer.",
+                  avg_rate=avg_rate, accepted=False)
         test_history += f"\nOverall Result: Not Accepted (Threshold: {threshold})"
 
     return end_time - start_time, rates, avg_rate, test_history
 
-  def grade_multiple_question(self, instructions, student_answers, stream=False):
+  def grade_multiple_question(self, instructions, student_answers, stream=False, token_budget=None, references=None, bad_answers=None):
     """Grades a conceptual, multi-part question without discrete test cases."""
     start_time = time.time()
+    verdict = self._screen(instructions, student_answers, references, bad_answers)
+    if verdict and verdict.action == 'reject':
+        # There is no LLM pass/fail for conceptual questions to audit against, so rejections always apply
+        return time.time() - start_time, [0.0], 0.0, str(verdict)
 
     # Combine instructions and answers for a holistic review
-    full_context = ""
-    for i, instruction in enumerate(instructions):
-        answer = student_answers[i] if i < len(student_answers) else "[No answer provided]"
-        full_context += f"Instruction {i+1}: {instruction}\nStudent's Answer {i+1}: {answer}\n\n"
-
-    prompt = f"""
-    You are a helpful teaching assistant providing feedback on a multi-part computer science question.
-    Below are the instructions the student was given and their corresponding answers.
-
-    {full_context}
-
-    Your task is to:
-    1. Review all the student's answers in the context of the instructions.
-    2. Provide constructive feedback on each part.
-    3. Explain what they did well and where they can improve.
-    4. Do NOT give the direct, correct answer. Guide the student toward it.
-
-    Please provide your feedback now.
-    """
+    with profiler.stage('prompt_build'):
+        prompt, notices = build_feedback_prompt(instructions, student_answers, token_budget or self.token_budget, self.model)
 
-    print("--- Evaluating your response... ---")
+    self._log(logging.INFO, "--- Evaluating your response... ---")
+    for notice in notices:
+        self._log(logging.INFO, notice)
     feedback = self.chat_completion_openai(prompt, stream=stream)
+    if notices:
+        feedback = "\n".join(notices) + "\n\n" + feedback
     end_time = time.time()
 
     # For multi-part questions, the "rate" is qualitative. We return 1.0 for completion.
     # The 'test_history' is the qualitative feedback itself.
     return end_time - start_time, [1.0], 1.0, feedback
+
+  def grade_conceptual_questions(self, questions, stream=False):
+    """
+    Grades several conceptual questions of one submission in a single request.
+    questions is a list of (q_id, instructions, answers, token_budget, references,
+    bad_answers), the last three None when the question does not set them; returns {q_id: (time, rates, avg_rate, feedback)} like grade_multiple_question.
+    Any question the response has no feedback block for is graded on its own.
+    Questions the pre-screen rejects are left out of the request.
+    """
+    results = {}
+    if self.prescreen is not None:
+        for q_id, instructions, answers, _, references, bad_answers in questions:
+            verdict = self._screen(instructions, answers, references, bad_answers)
+            if verdict.action == 'reject':
+                results[q_id] = (0.0, [0.0], 0.0, str(verdict))
+        questions = [q for q in questions if q[0] not in results]
+        if not questions:
+            return results
+    questions = [question[:4] for question in questions] # The pre-screen examples are not part of the prompt
+    start_time = time.time()
+    with profiler.stage('prompt_build'):
+        prompt, notices = build_packed_feedback_prompt(questions, self.token_budget, self.model)
+
+    self._log(logging.INFO, f"--- Evaluating {len(questions)} questions in one request... ---")
+    response = self.chat_completion_openai(prompt, stream=stream)
+    with profiler.stage('parse'):
+        feedback = split_packed_feedback(response, {q_id for q_id, _, _, _ in questions})
+    share = (time.time() - start_time) / max(1, len(feedback))
+
+    for q_id, instructions, answers, token_budget in questions:
+        if q_id not in feedback:
+            self._log(logging.WARNING, f"No feedback block for {q_id} in the combined response; grading it separately.")
+            results[q_id] = self.grade_multiple_question(instructions, answers, stream=stream, token_budget=token_budget)
+            continue
+        text = feedback[q_id]
+        if notices[q_id]:
+            text = "\n".join(notices[q_id]) + "\n\n" + text
+        results[q_id] = (share, [1.0], 1.0, text)
+    return results
@@ -0,0 +1,85 @@
+import os
+import threading
+from openai import OpenAI, DefaultHttpxClient
+import httpx
+
+# Providers that speak the OpenAI chat completions protocol. Gemini exposes an
+# OpenAI-compatible endpoint, and local servers (vLLM, llama.cpp, Ollama, ...) do too.
+PROVIDERS = {
+    'openai': {'base_url': None, 'api_key_env': 'OPENAI_API_KEY'},
+    'gemini': {'base_url': 'https://generativelanguage.googleapis.com/v1beta/openai/', 'api_key_env': 'GEMINI_API_KEY'},
+    'local': {'base_url': 'http://localhost:8000/v1', 'base_url_env': 'LOCAL_LLM_BASE_URL', 'api_key_env': 'LOCAL_LLM_API_KEY',
+              'api_key_optional': True},
+}
+
+# Keep-alive connection pool shared by every request to one backend
+POOL_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60)
+
+
+class Backend:
+    """A chat completion endpoint. Subclasses implement create() for a provider's protocol."""
+
+    def __init__(self, provider, base_url, api_key):
+        self.provider = provider
+        self.base_url = base_url
+        self.api_key = api_key
+
+    def create(self, model, messages, **kwargs):
+        raise NotImplementedError
+
+
+class OpenAIBackend(Backend):
+    """Any OpenAI-compatible endpoint, backed by one pooled OpenAI client."""
+
+    def __init__(self, provider, base_url, api_key):
+        super().__init__(provider, base_url, api_key)
+        # Retries are handled by LLM.chat_completion_openai, so the client's own retry loop is disabled
+        self.client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0,
+                             http_client=DefaultHttpxClient(limits=POOL_LIMITS))
+
+    def create(self, model, messages, **kwargs):
+        return self.client.chat.completions.create(model=model, messages=messages, **kwargs)
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def register_provider(name, base_url=None, api_key_env=None, backend_class=OpenAIBackend, api_key_optional=False):
+    """
+    Adds or overrides a provider, e.g. register_provider('lab', 'http://gpu-box:8000/v1').
+    Without api_key_env the provider needs no key.
+    """
+    PROVIDERS[name] = {'base_url': base_url, 'api_key_env': api_key_env, 'backend_class': backend_class,
+                       'api_key_optional': api_key_optional}
+
+
+def parse_model(model):
+    """Splits 'provider:model' into its parts; bare model names are routed by their prefix."""
+    if ':' in model:
+        provider, name = model.split(':', 1)
+        if provider in PROVIDERS:
+            return provider, name
+    if model.startswith('gemini'):
+        return 'gemini', model
+    return 'openai', model
+
+
+def get_backend(provider='openai', base_url=None):
+    """Returns the process-wide backend for (provider, base URL), creating its client on first use."""
+    if provider not in PROVIDERS:
+        raise ValueError(f"Unknown LLM provider '{provider}'. Known providers: {', '.join(PROVIDERS)}")
+    config = PROVIDERS[provider]
+    # Environment overrides are read on first use, so a .env loaded after this module was imported still applies
+    base_url = base_url or (config.get('base_url_env') and os.getenv(config['base_url_env'])) or config['base_url']
+    key = (provider, base_url)
+    with _registry_lock:
+        if key not in _registry:
+            api_key = os.getenv(config['api_key_env']) if config['api_key_env'] else None
+            if not api_key:
+                if config['api_key_env'] and not config.get('api_key_optional'):
+                    raise ValueError(f"{config['api_key_env']} environment variable not set.")
+                api_key = "not-needed"
+            backend_class = config.get('backend_class', OpenAIBackend)
+            _registry[key] = backend_class(provider, base_url, api_key)
+        return _registry[key]
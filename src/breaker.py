@@ -0,0 +1,233 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict, deque
+from pathlib import Path
+import scheduler
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+
+class CircuitOpen(RuntimeError):
+    """Raised instead of calling a backend that is failing, so callers do not wait on it."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Tracks the outcome of recent calls to one model. A call is bad if it failed
+    transiently (timeout, connection error, 5xx) or took longer than
+    slow_call_seconds. Once at least min_calls were made in the last `window`
+    seconds and the bad fraction reaches failure_threshold, or the last
+    consecutive_failures calls were all bad (a stalled upstream timing out one
+    call at a time never fills the window), the circuit opens: calls fail fast
+    for `cooldown` seconds. Then it is half-open and one probe call is let
+    through; its success closes the circuit, its failure reopens it. With a
+    BreakerBoard, a circuit opened by any process is open in all of them.
+    """
+
+    def __init__(self, name, failure_threshold=0.5, min_calls=10, window=60.0, slow_call_seconds=30.0,
+                 consecutive_failures=3, cooldown=30.0, probe_timeout=120.0, board=None):
+        self.name = name
+        self.board = board
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.window = window
+        self.slow_call_seconds = slow_call_seconds
+        self.consecutive_failures = consecutive_failures
+        self.cooldown = cooldown
+        self.probe_timeout = probe_timeout # A probe that never reports back no longer blocks the next one
+        self.state = CLOSED
+        self._lock = threading.Lock()
+        self._calls = deque()  # (time, bad)
+        self._streak = 0       # bad calls in a row
+        self._opened = 0.0
+        self._probe = None     # start time of the half-open probe in flight
+
+    def allow(self):
+        """Returns if a call may go ahead; raises CircuitOpen if it should fail fast."""
+        opened = self.board.opened(self.name, self.cooldown) if self.board is not None else None
+        now = time.monotonic()
+        with self._lock:
+            if opened is not None and self.state == CLOSED: # Another process found the upstream down
+                self.state = OPEN
+                self._opened = now - (time.time() - opened)
+                self._calls.clear()
+                self._streak = 0
+            if self.state == OPEN and now - self._opened >= self.cooldown:
+                self.state = HALF_OPEN
+                self._probe = None
+            if self.state == HALF_OPEN and (self._probe is None or now - self._probe >= self.probe_timeout):
+                self._probe = now
+                return
+            if self.state == CLOSED:
+                return
+            retry_after = max(1, int(self._opened + self.cooldown - now + 0.999))
+        raise CircuitOpen(f"The grading service ({self.name}) is not responding right now. "
+                          f"Please try again in about {retry_after} seconds.", retry_after)
+
+    def record(self, failed, seconds=None):
+        """Reports one attempt: failed transiently, or completed in `seconds`."""
+        now = time.monotonic()
+        bad = failed or (seconds is not None and seconds > self.slow_call_seconds)
+        with self._lock:
+            before = self.state
+            self._record(now, bad)
+            after = self.state
+        if self.board is not None and after != before:
+            if after == OPEN:
+                self.board.publish(self.name)
+            elif after == CLOSED:
+                self.board.clear(self.name)
+
+    def _record(self, now, bad):
+        if self.state == HALF_OPEN:
+            self._probe = None
+            if bad:
+                self._trip(now)
+            else:
+                self.state = CLOSED
+                self._calls.clear()
+            return
+        if self.state == OPEN:
+            return # A call that started before the circuit opened
+        self._streak = self._streak + 1 if bad else 0
+        if self.consecutive_failures and self._streak >= self.consecutive_failures:
+            self._trip(now)
+            return
+        self._calls.append((now, bad))
+        while self._calls and self._calls[0][0] < now - self.window:
+            self._calls.popleft()
+        failures = sum(bad for _, bad in self._calls)
+        if len(self._calls) >= self.min_calls and failures / len(self._calls) >= self.failure_threshold:
+            self._trip(now)
+
+    @property
+    def is_open(self):
+        with self._lock:
+            return self.state == OPEN and time.monotonic() - self._opened < self.cooldown
+
+    def _trip(self, now):
+        self.state = OPEN
+        self._opened = now
+        self._calls.clear()
+        self._streak = 0
+
+
+class BreakerBoard:
+    """
+    Open circuits published in a JSON file (under an fcntl lock), so that every
+    Playground kernel and grade.py run on the machine fails fast as soon as one
+    of them finds a model's upstream down, instead of each waiting through its
+    own retries first. Reads are cached for `refresh` seconds.
+    """
+
+    def __init__(self, path, refresh=1.0):
+        self.path = Path(path)
+        self.refresh = refresh
+        self._lock = threading.Lock()
+        self._read_at = None
+        self._opened = {}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def opened(self, name, cooldown):
+        """Wall-clock time another process opened this circuit, if that was less than cooldown seconds ago."""
+        now = time.monotonic()
+        with self._lock:
+            if self._read_at is None or now - self._read_at >= self.refresh:
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f: # Written atomically, so no lock is needed
+                        self._opened = json.load(f)
+                except (FileNotFoundError, json.JSONDecodeError):
+                    self._opened = {}
+                self._read_at = now
+            opened = self._opened.get(name)
+        return opened if opened is not None and time.time() - opened < cooldown else None
+
+    def publish(self, name):
+        with scheduler.locked_json(self.path, {}) as circuits:
+            circuits[name] = time.time()
+        with self._lock:
+            self._opened[name] = circuits[name]
+
+    def clear(self, name):
+        with scheduler.locked_json(self.path, {}) as circuits:
+            circuits.pop(name, None)
+        with self._lock:
+            self._opened.pop(name, None)
+
+
+class ResponseCache:
+    """The most recent successful response per (model, prompt), served while a circuit is open."""
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(model, prompt):
+        return model, hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+    def get(self, model, prompt):
+        key = self._key(model, prompt)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        return None
+
+    def put(self, model, prompt, response):
+        key = self._key(model, prompt)
+        with self._lock:
+            self._entries[key] = response
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_breakers = {}
+_settings = {}
+_board = None
+_lock = threading.Lock()
+
+# Process-wide cache of recent responses, shared by every LLM instance
+responses = ResponseCache()
+
+
+def get_breaker(name):
+    """The process-wide circuit breaker for one model, e.g. 'openai:gpt-4o-mini'."""
+    with _lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, board=_board, **_settings)
+        return _breakers[name]
+
+
+def configure_breakers(**settings):
+    """Sets the CircuitBreaker parameters for every model, e.g. configure_breakers(cooldown=60), resetting their state."""
+    with _lock:
+        _settings.clear()
+        _settings.update(settings)
+        _breakers.clear()
+
+
+def share_breakers(path=None):
+    """
+    Publishes this process's open circuits to the BreakerBoard at path and adopts
+    other processes' (default: breakers.json next to the shared scheduler state).
+    Without fcntl (e.g. on Windows) each process keeps its own circuits.
+    """
+    global _board
+    if scheduler.fcntl is None:
+        return
+    path = Path(path or Path(os.getenv('LLM_SCHEDULER_FILE') or scheduler.SHARED_STATE).with_name("breakers.json"))
+    with _lock:
+        if _board is None or _board.path != path:
+            _board = BreakerBoard(path)
+            for breaker in _breakers.values():
+                breaker.board = _board
@@ -0,0 +1,151 @@
+import os
+import gzip
+import json
+import time
+import tempfile
+import threading
+from collections import deque
+
+
+def atomic_write_json(path, data, **dump_kwargs):
+    """Writes JSON to a temporary file in the same directory and renames it over path."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, **dump_kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class DraftLog:
+    """
+    Append-only JSON-lines log of a student's draft answers. Each autosave
+    appends only the questions that changed; the latest record per question wins.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def append(self, drafts):
+        """Appends {q_id: answers} as one durable record per question."""
+        if not drafts:
+            return
+        lines = "".join(json.dumps({'q': q_id, 'answers': answers, 't': time.time()}) + "\n"
+                        for q_id, answers in drafts.items())
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def latest(self):
+        """{q_id: answers} folded from the log; a torn last line from a crash is ignored."""
+        drafts = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    drafts[record['q']] = record['answers']
+        except FileNotFoundError:
+            pass
+        return drafts
+
+    def compact(self):
+        """Atomically rewrites the log with a single record per question."""
+        drafts = self.latest()
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".jsonl")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                for q_id, answers in drafts.items():
+                    f.write(json.dumps({'q': q_id, 'answers': answers, 't': time.time()}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return drafts
+
+
+# The questions of one student share a spill log
+_spill_lock = threading.Lock()
+
+
+class AttemptHistory:
+    """
+    The most recent Test attempts for one question, kept in memory. Older
+    attempts are spilled to a gzip-compressed JSON-lines log shared by all of a
+    student's questions, so memory and submission size stay bounded. Spilled
+    attempts are written `batch` at a time, one gzip member per batch, and
+    numbering continues from the log after a kernel restart.
+    """
+
+    def __init__(self, q_id, path, keep=5, batch=20):
+        self.q_id = q_id
+        self.path = path
+        self.keep = keep
+        self.batch = batch
+        self.recent = deque()
+        self._pending = []     # Spilled attempts not written yet
+        self.spilled = 0
+        self.best_avg_rates = None
+        for record in self._read():
+            self.spilled = max(self.spilled, record['attempt'])
+            self.best_avg_rates = max(self.best_avg_rates or 0, record.get('avg_rates', 0))
+        self.count = self.spilled
+
+    def append(self, attempt):
+        self.count += 1
+        self.best_avg_rates = max(self.best_avg_rates or 0, attempt['avg_rates'])
+        self.recent.append(attempt)
+        if len(self.recent) > self.keep:
+            self.spilled += 1
+            self._pending.append({'q': self.q_id, 'attempt': self.spilled, **self.recent.popleft()})
+            if len(self._pending) >= self.batch:
+                self.flush()
+
+    def flush(self):
+        """Writes the pending spilled attempts to the log as one gzip member."""
+        if not self._pending:
+            return
+        lines = "".join(json.dumps(record) + "\n" for record in self._pending)
+        with _spill_lock, gzip.open(self.path, 'at', encoding='utf-8') as f: # Readers see the members as one stream
+            f.write(lines)
+        self._pending.clear()
+
+    def summary(self):
+        """Attempt counts plus a reference to the spill log, for the submission."""
+        self.flush()
+        return {'attempts': self.count, 'spilled': self.spilled, 'best_avg_rates': self.best_avg_rates,
+                'log': os.path.basename(self.path) if self.spilled else None}
+
+    def spilled_attempts(self):
+        """Attempts for this question that were moved to the log, oldest first."""
+        self.flush()
+        return self._read()
+
+    def _read(self):
+        """This question's records in the log; a member torn by a crash ends the read."""
+        records = []
+        try:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if record.get('q') == self.q_id:
+                        records.append(record)
+        except FileNotFoundError:
+            pass
+        except (EOFError, gzip.BadGzipFile):
+            pass
+        return records
@@ -3,22 +3,8 @@
 import json
 from pathlib import Path
 
-def generate_html_report(results_path, output_path):
-    """
-    Reads a grading_results.json file and generates a styled HTML report.
-    """
-    try:
-        with open(results_path, 'r', encoding='utf-8') as f:
-            grading_data = json.load(f)
-    except FileNotFoundError:
-        print(f"Error: Grading results file not found at {results_path}")
-        return
-    except json.JSONDecodeError:
-        print(f"Error: Could not decode JSON from {results_path}. Make sure it's a valid JSON file.")
-        return
-
-    # --- HTML and CSS Styling ---
-    html_content = """
+# --- HTML and CSS Styling ---
+REPORT_HEADER = """
     <!DOCTYPE html>
     <html lang="en">
     <head>
@@ -48,26 +34,43 @@ def generate_html_report(results_path, output_path):
             <h1>Socrates Grading Report</h1>
     """
 
-    # --- Generate Content for Each Student ---
-    for student_file, results in grading_data.items():
-        # Clean up student ID from filename
-        student_id = student_file.replace("answers_", "").replace(".json", "")
+REPORT_FOOTER = """
+        </div>
+    </body>
+    </html>
+    """
+
+def load_results(results_path):
+    """Reads a grading_results.json file, returning None if it is missing or invalid."""
+    try:
+        with open(results_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        print(f"Error: Grading results file not found at {results_path}")
+    except json.JSONDecodeError:
+        print(f"Error: Could not decode JSON from {results_path}. Make sure it's a valid JSON file.")
+    return None
+
+def render_student_card(student_file, results):
+    """Renders the HTML card for one student's results."""
+    # Clean up student ID from filename
+    student_id = student_file.replace("answers_", "").replace(".json", "")
 
-        html_content += f"""
+    card = f"""
         <div class="student-card">
             <div class="student-header">Student: {student_id}</div>
         """
 
-        # Sort questions by ID (q1, q2, etc.)
-        sorted_questions = sorted(results.keys())
+    # Sort questions by ID (q1, q2, etc.)
+    sorted_questions = sorted(results.keys())
 
-        for q_id in sorted_questions:
-            q_data = results[q_id]
-            avg_rate = q_data.get('avg_rates', 0)
-            status_class = "status-accepted" if avg_rate >= 0.5 else "status-failed"
-            status_text = "Accepted" if avg_rate >= 0.5 else "Failed"
+    for q_id in sorted_questions:
+        q_data = results[q_id]
+        avg_rate = q_data.get('avg_rates', 0)
+        status_class = "status-accepted" if avg_rate >= 0.5 else "status-failed"
+        status_text = "Accepted" if avg_rate >= 0.5 else "Failed"
 
-            html_content += f"""
+        card += f"""
             <div class="question-block">
                 <span class="question-title">Question {q_id.replace('q', '')}</span>
                 <span class="status {status_class}">{status_text}</span>
@@ -77,18 +80,46 @@ def generate_html_report(results_path, output_path):
                 </div>
             </div>
             """
+    return card
 
-    html_content += """
-        </div>
-    </body>
-    </html>
-    """
-
-    # --- Write the HTML file ---
+def write_report(cards, output_path):
+    """Assembles rendered student cards into the report file."""
+    html_content = REPORT_HEADER + "".join(cards) + REPORT_FOOTER
     with open(output_path, 'w', encoding='utf-8') as f:
         f.write(html_content)
     print(f"Success! Report generated at: {output_path}")
 
+def generate_html_report(results_path, output_path):
+    """
+    Reads a grading_results.json file and generates a styled HTML report.
+    """
+    grading_data = load_results(results_path)
+    if grading_data is None:
+        return
+    write_report([render_student_card(student_file, results) for student_file, results in grading_data.items()], output_path)
+
+
+class IncrementalReport:
+    """
+    Keeps rendered student cards between updates so only students whose
+    results changed are re-rendered (used by `grade.py --watch`).
+    """
+
+    def __init__(self, results_path, output_path):
+        self.results_path = results_path
+        self.output_path = output_path
+        self._cards = {}
+
+    def update(self, student_files=None):
+        """Re-renders the given students (all when None and on first use) and rewrites the report."""
+        grading_data = load_results(self.results_path)
+        if grading_data is None:
+            return
+        for student_file, results in grading_data.items():
+            if student_file not in self._cards or student_files is None or student_file in student_files:
+                self._cards[student_file] = render_student_card(student_file, results)
+        write_report([self._cards[student_file] for student_file in grading_data], self.output_path)
+
 
 if __name__ == "__main__":
     # Define paths relative to the project structure
@@ -1,41 +1,272 @@
 import sys
 import json
+import logging
+import hashlib
+import argparse
+import contextlib
 from pathlib import Path
 from Grader import Grader
+from watcher import SubmissionWatcher
+from generate_report import IncrementalReport
+from profiling import profiler
+from progress import progress
+import logs
+from logs import log
+from prescreen import PreScreen
+from planner import plan_grading, print_plan
+from submissions import InvalidSubmission, iter_directory, validate_submission
+from breaker import configure_breakers, share_breakers
+from scheduler import share_scheduler
+from shards import ShardError, find_shards, merge_shards, parse_shard, shard_of, shard_path
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python grade.py <path_to_assignment_file.json>")
+def parse_args():
+    parser = argparse.ArgumentParser(description="Grade student submissions against a master assignment file.")
+    parser.add_argument("assignment", help="path to the master assignment JSON file")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and grade new or modified submissions as they arrive")
+    parser.add_argument("--interval", type=float, default=5.0,
+                        help="polling interval in seconds for --watch when inotify is unavailable")
+    parser.add_argument("--pack-conceptual", action="store_true",
+                        help="grade all of a student's questions without testcases in a single LLM request")
+    parser.add_argument("--regrade", action="store_true",
+                        help="reuse verdicts from grading_results.json for unchanged questions, testcases and answers "
+                             "graded with the same model and settings")
+    parser.add_argument("--prescreen", action="store_true",
+                        help="reject blank, placeholder and copied answers locally instead of sending them to the LLM")
+    parser.add_argument("--prescreen-audit", action="store_true",
+                        help="grade pre-screened answers with the LLM anyway and report the pre-screen's precision")
+    parser.add_argument("--ensemble", nargs="+", metavar="MODEL",
+                        help="evaluate each test case with several models at once, e.g. gpt-4o gpt-3.5-turbo gemini-1.5-flash")
+    parser.add_argument("--quorum", type=int,
+                        help="--ensemble: agreeing verdicts needed to decide a test case (default: a majority)")
+    parser.add_argument("--fallback", metavar="MODEL",
+                        help="answer with MODEL while the grading model's circuit breaker is open, e.g. gemini-1.5-flash")
+    parser.add_argument("--breaker-threshold", type=float, default=0.5,
+                        help="fraction of failed or slow calls in the last minute that opens the circuit breaker")
+    parser.add_argument("--breaker-cooldown", type=float, default=30.0,
+                        help="seconds an open circuit fails fast before a probe call is let through")
+    parser.add_argument("--shard", metavar="K/N", type=shard_spec,
+                        help="grade only the K-th of N deterministic shards of the students (by a hash of the "
+                             "student ID) into grading_results.shard-K-of-N.json; combine them with 'grade.py merge'")
+    parser.add_argument("--plan", action="store_true",
+                        help="print the expected LLM calls, tokens, cost and wall time without grading")
+    parser.add_argument("--pass-rate", type=float, default=0.7,
+                        help="--plan: assumed chance that a test case evaluation ends in 'Correct'")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="--plan: assumed chance that an API call fails transiently and is retried")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="--plan: requests in flight at once (1 for a single grade.py process)")
+    parser.add_argument("--latency", type=float, default=3.0, help="--plan: assumed seconds per call")
+    parser.add_argument("--rpm", type=float, help="--plan: requests-per-minute rate limit")
+    parser.add_argument("--tpm", type=float, help="--plan: tokens-per-minute rate limit")
+    parser.add_argument("--price-in", type=float, help="--plan: USD per million prompt tokens for the grading model and unlisted models")
+    parser.add_argument("--price-out", type=float, help="--plan: USD per million completion tokens for the grading model and unlisted models")
+    parser.add_argument("--progress", action="store_true",
+                        help="show a live progress line (items, calls/s, tokens/min, retries, ETA); "
+                             "per-test-case output goes to grading.log instead")
+    parser.add_argument("--status-file", metavar="FILE",
+                        help="keep a JSON progress snapshot in FILE for other processes to poll "
+                             "(default with --progress: grading_status.json)")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="lowest level of grading messages shown on the console (default: INFO)")
+    parser.add_argument("--quiet", action="store_true",
+                        help="batch mode: only show warnings and errors on the console (same as --log-level WARNING)")
+    parser.add_argument("--log-json", metavar="FILE",
+                        help="also append every log record, DEBUG included, to FILE as JSON lines tagged with "
+                             "student, question and testcase")
+    parser.add_argument("--profile", nargs="?", const="grading_trace.json", metavar="TRACE_FILE",
+                        help="record per-stage timings and write a Chrome trace (default: grading_trace.json)")
+    parser.add_argument("--cprofile", metavar="STATS_FILE",
+                        help="also write a cProfile dump, readable with pstats or snakeviz")
+    args = parser.parse_args()
+    if args.shard and args.watch:
+        parser.error("--shard cannot be combined with --watch")
+    return args
+
+def shard_spec(value):
+    try:
+        return parse_shard(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def parse_merge_args(argv):
+    parser = argparse.ArgumentParser(prog="grade.py merge",
+                                     description="Combine the partial results of 'grade.py --shard K/N' runs into grading_results.json.")
+    parser.add_argument("shards", nargs="*",
+                        help="partial results files (default: every grading_results.shard-*-of-*.json here)")
+    parser.add_argument("--submissions", metavar="DIR",
+                        help="also check that every answers_*.json in DIR was graded (default: the result folder)")
+    return parser.parse_args(argv)
+
+def merge(argv):
+    """Merges shard results, refusing if a shard is missing or a student is in none or several of them."""
+    args = parse_merge_args(argv)
+    results_path = Path('grading_results.json')
+    paths = args.shards or find_shards(results_path)
+    if not paths:
+        print(f"No shard results found next to {results_path}.")
+        sys.exit(1)
+    submissions_dir = Path(args.submissions) if args.submissions else Path(__file__).parent.parent / "result"
+    expected = [s.student_id for s in iter_directory(submissions_dir)] if submissions_dir.is_dir() else None
+    try:
+        count = merge_shards(paths, results_path, expected)
+    except ShardError as e:
+        print(f"Cannot merge {len(paths)} shard file(s):\n{e}")
         sys.exit(1)
+    print(f"Merged {count} students from {len(paths)} shards into {results_path}")
+
+def watch(g, results_dir, interval):
+    """Grades only new or modified submissions, merging them into the gradebook and report."""
+    watcher = SubmissionWatcher(results_dir, interval=interval)
+    report = IncrementalReport(Path('grading_results.json'), results_dir.parent / "grading_report.html")
+    log.info(f"--- Watching '{results_dir}' for submissions (Ctrl+C to stop) ---")
+    try:
+        while True:
+            graded = {}
+            for file_path in watcher.changed():
+                stat = file_path.stat() # Before reading, so a rewrite during grading is noticed next time
+                data = file_path.read_bytes()
+                try:
+                    submission = json.loads(data.decode('utf-8'))
+                except (UnicodeDecodeError, json.JSONDecodeError):
+                    log.warning(f"Skipping {file_path.name} for now: not valid JSON yet (still being written?)")
+                    continue
+                try:
+                    validate_submission(submission)
+                except InvalidSubmission as e:
+                    log.warning(f"Skipping {file_path.name}: {e}")
+                    continue
+                g._student_answers[file_path.name] = submission
+                graded[file_path] = hashlib.sha256(data).hexdigest(), stat
+
+            if graded:
+                g.final_results = {}
+                g.load_previous_results()
+                done = g.grade(merge=True)
+                # Submissions skipped during an outage stay unmarked, so the next scan picks them up again
+                for file_path, (digest, stat) in graded.items():
+                    if file_path.name in done:
+                        watcher.mark_graded(file_path, digest, stat)
+                watcher.save()
+                report.update({file_path.name for file_path in graded if file_path.name in done})
+                g._student_answers.clear()
+            watcher.wait()
+    except KeyboardInterrupt:
+        log.info("\n--- Stopped watching ---")
+
+@contextlib.contextmanager
+def reporting(args):
+    """Publishes live progress for --progress/--status-file, sending the per-test-case output to grading.log."""
+    status_file = args.status_file or ("grading_status.json" if args.progress else None)
+    if not status_file:
+        yield
+        return
+    stream = sys.stderr if args.progress else None
+    interval = 1.0 if stream is None or stream.isatty() else 10.0
+    with contextlib.ExitStack() as stack:
+        if args.progress:
+            log_file = stack.enter_context(open("grading.log", 'a', encoding='utf-8'))
+            stack.enter_context(contextlib.redirect_stdout(log_file))
+        stack.callback(logs.flush) # Queued grading output still goes to grading.log
+        stack.enter_context(progress.report(status_file, stream, interval=interval))
+        yield
+
+def main():
+    if sys.argv[1:2] == ["merge"]:
+        merge(sys.argv[2:])
+        return
+    args = parse_args()
+    logs.configure(logging.WARNING if args.quiet else getattr(logging, args.log_level), args.log_json)
+    if not (args.profile or args.cprofile):
+        run(args)
+        return
+
+    # Profiling run: stage timings and/or a cProfile dump are written even if grading fails
+    profiler.enabled = bool(args.profile)
+    cprof = None
+    if args.cprofile:
+        import cProfile
+        cprof = cProfile.Profile()
+        cprof.enable()
+    try:
+        run(args)
+    finally:
+        if cprof:
+            cprof.disable()
+            cprof.dump_stats(args.cprofile)
+            print(f"cProfile stats written to {args.cprofile}")
+        if args.profile:
+            profiler.print_summary()
+            profiler.write(args.profile)
 
-    assignment_file = Path(sys.argv[1])
+def run(args):
+    """Loads the assignment and submissions and grades them (or watches for them)."""
+    assignment_file = Path(args.assignment)
     if not assignment_file.is_file():
-        print(f"Error: Assignment file not found at {assignment_file}")
+        log.error(f"Error: Assignment file not found at {assignment_file}")
         sys.exit(1)
 
-    print("--- Starting Automated Grading Process ---")
+    log.info("--- Starting Automated Grading Process ---")
 
     codes_dir = Path(__file__).parent
     results_dir = codes_dir.parent / "result"
-    answer_files = list(results_dir.glob("answers_*.json"))
-
-    if not answer_files:
-        print(f"No student answer files found in '{results_dir}'.")
-        return
 
     # Initialize the grader and load the master assignment
     g = Grader()
     g.load_assignment(assignment_file)
+    g.pack_conceptual = args.pack_conceptual
+    if args.ensemble:
+        g.llm.set_ensemble(args.ensemble, args.quorum)
+    configure_breakers(failure_threshold=args.breaker_threshold, cooldown=args.breaker_cooldown)
+    if args.fallback:
+        g.llm.set_fallback(args.fallback)
+    g.keep_results = False # Results are streamed to grading_results.json as each student completes
+    if args.prescreen or args.prescreen_audit:
+        g.llm.prescreen = PreScreen(audit=args.prescreen_audit)
+    if not args.plan:
+        try:
+            g.llm.connect() # Fail before any work rather than at the first call
+        except ValueError as e:
+            log.error(f"Error: {e}")
+            sys.exit(1)
+        share_scheduler() # Batch calls wait behind the students' interactive ones
+        share_breakers()
+
+    if args.watch:
+        with reporting(args):
+            watch(g, results_dir, args.interval)
+        return
 
-    # Load each student's answers
-    for file_path in answer_files:
-        student_id = file_path.name
-        with open(file_path, 'r', encoding='utf-8') as f:
-            g._student_answers[student_id] = json.load(f)
+    # Submissions are only decoded when grading reaches them (with a small prefetch window)
+    for submission in iter_directory(results_dir):
+        if args.shard and shard_of(submission.student_id, args.shard[1]) != args.shard[0]:
+            continue # Another machine's student
+        g._student_answers[submission.student_id] = submission
+
+    if args.shard:
+        g.results_path = shard_path(g.results_path, *args.shard)
+        log.info(f"Shard {args.shard[0]}/{args.shard[1]}: {len(g._student_answers)} students, results go to {g.results_path}")
+
+    if not g._student_answers:
+        log.warning(f"No student answer files found in '{results_dir}'.")
+        if args.shard and not args.plan:
+            g.output_score() # An empty partial results file, so that merge still sees this shard
+        return
+
+    if args.regrade:
+        # A shard reuses its own earlier partial results, or the merged gradebook if it has none
+        g.load_previous_results(g.results_path if Path(g.results_path).is_file() else 'grading_results.json')
+
+    if args.plan:
+        prices = (args.price_in, args.price_out) if args.price_in is not None and args.price_out is not None else None
+        print_plan(plan_grading(g, args.pass_rate, args.error_rate), g.llm.model, args.concurrency, args.latency,
+                   args.rpm, args.tpm, prices)
+        return
 
     # Run the grading process
-    g.grade()
-    print("--- Automated Grading Complete ---")
+    with reporting(args):
+        g.grade()
+    log.info("--- Automated Grading Complete ---")
 
 if __name__ == "__main__":
     main()
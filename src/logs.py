@@ -0,0 +1,113 @@
+import sys
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Grading output goes through this logger. Until configure() is called (as grade.py does), INFO and
+# above are written straight to stdout, so notebooks show them in order with their other output.
+log = logging.getLogger("socrates")
+log.setLevel(logging.DEBUG)
+log.propagate = False
+
+_context = ContextVar("log_context", default={})
+_listener = None
+
+
+@contextmanager
+def context(**fields):
+    """Tags records logged in this block (and this thread) with fields such as student, question or testcase."""
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    def filter(self, record):
+        if not hasattr(record, 'context'):
+            record.context = _context.get()
+        return True
+
+
+class ConsoleHandler(logging.StreamHandler):
+    """Writes the bare message to whatever sys.stdout is when the record is emitted, so redirection keeps working."""
+
+    def __init__(self):
+        super().__init__(sys.stdout)
+        self.setFormatter(logging.Formatter("%(message)s"))
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class JSONLinesFormatter(logging.Formatter):
+    """One JSON object per record: time, level, thread, context fields, message and any extra `fields`."""
+
+    def format(self, record):
+        entry = {'time': round(record.created, 3), 'level': record.levelname, 'thread': record.threadName,
+                 **getattr(record, 'context', {}), 'message': record.getMessage().strip()}
+        entry.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+_console = ConsoleHandler()
+_console.setLevel(logging.INFO)
+log.addFilter(ContextFilter())
+log.addHandler(_console)
+
+
+def configure(level=logging.INFO, jsonl_path=None):
+    """
+    Switches to batch logging: records are queued and written by a background
+    thread, so grading never waits on the console. The console shows `level`
+    and above (WARNING for a quiet run); jsonl_path, if given, receives every
+    record, DEBUG included, as JSON lines for analysis after the run.
+    """
+    global _listener
+    shutdown()
+    console = ConsoleHandler()
+    console.setLevel(level)
+    handlers = [console]
+    if jsonl_path:
+        sink = logging.FileHandler(jsonl_path, mode='a', encoding='utf-8')
+        sink.setFormatter(JSONLinesFormatter())
+        sink.setLevel(logging.DEBUG)
+        handlers.append(sink)
+    records = queue.SimpleQueue()
+    for handler in list(log.handlers):
+        log.removeHandler(handler)
+    log.addHandler(logging.handlers.QueueHandler(records)) # Context is attached before queueing
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def flush():
+    """Waits until every record queued so far has been written."""
+    if _listener is not None:
+        _listener.stop()  # Drains the queue
+        _listener.start()
+
+
+def shutdown():
+    """Writes out queued records and stops the background writer, if configure() started one."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown)
@@ -0,0 +1,177 @@
+from collections import defaultdict
+from submissions import LazySubmission
+from prompts import COMPLETION_TOKENS, build_feedback_prompt, build_packed_feedback_prompt, build_testcase_prompt, count_tokens
+
+# USD per million (input, output) tokens; models not listed need --price-in/--price-out
+PRICES = {
+    'gpt-4o-mini': (0.15, 0.60),
+    'gpt-4o': (2.50, 10.00),
+    'gpt-4.1-mini': (0.40, 1.60),
+    'gpt-4.1': (2.00, 8.00),
+    'gemini-1.5-flash': (0.075, 0.30),
+    'gemini-1.5-pro': (1.25, 5.00),
+}
+
+CONSISTENCY_ATTEMPTS = 3 # grade_one_question asks up to 3 times per test case until one says "Correct"
+TRANSPORT_ATTEMPTS = 3   # chat_completion_openai's default retries
+
+
+def expected_attempts(success, limit):
+    """Expected tries when each try succeeds with probability `success` and at most `limit` are made."""
+    return sum((1 - success) ** k for k in range(limit))
+
+
+class QuestionPlan:
+    def __init__(self):
+        self.students = 0
+        self.reused = 0
+        self.screened = 0
+        self.requests = 0       # Logical requests before any retries
+        self.calls = 0.0        # Expected API calls including retries
+        self.max_calls = 0
+        self.tokens = defaultdict(lambda: [0.0, 0.0]) # model -> expected [prompt, completion] tokens
+
+    def add(self, model, prompt_tokens, logical, expected, worst):
+        """Adds `logical` requests of prompt_tokens each to `model`, made `expected` (at most `worst`) times apiece."""
+        self.requests += logical
+        self.calls += logical * expected
+        self.max_calls += logical * worst
+        tokens = self.tokens[model]
+        tokens[0] += logical * expected * prompt_tokens
+        tokens[1] += logical * expected * COMPLETION_TOKENS
+
+    @property
+    def prompt_tokens(self):
+        return sum(prompt for prompt, _ in self.tokens.values())
+
+    @property
+    def completion_tokens(self):
+        return sum(completion for _, completion in self.tokens.values())
+
+
+def plan_grading(grader, pass_rate=0.7, error_rate=0.0):
+    """
+    Walks every submission the way Grader.grade_submission would, without calling
+    the LLM, and returns {q_id: QuestionPlan}. pass_rate is the chance that one
+    test case evaluation ends in "Correct"; error_rate the chance that an API call
+    fails transiently and is retried. Only model names are read from grader.llm,
+    so no backend client is created and no API key is needed.
+    """
+    llm = grader.llm
+    transport = expected_attempts(1 - error_rate, TRANSPORT_ATTEMPTS)
+    consistency = expected_attempts(pass_rate, CONSISTENCY_ATTEMPTS)
+    plans = defaultdict(QuestionPlan)
+    # Every ensemble model is asked (and billed at its own price), even when cancelled late
+    voters = [member.model for member in llm.ensemble] or [llm.model]
+
+    for student_id, submission in grader._student_answers.items():
+        if isinstance(submission, LazySubmission):
+            submission = submission.load()
+        previous = grader.previous_results.get(student_id)
+        packed = []
+        for q_id, content in submission.items():
+            master = grader._master_questions.get(q_id)
+            if master is None:
+                continue
+            plan = plans[q_id]
+            plan.students += 1
+            instructions = master.get('instructions', [])
+            testcases = master.get('testcases', [])
+            answers = content['answers']
+            budget = master.get('token_budget') or llm.token_budget
+            reusable = grader._reusable(q_id, content, previous)
+
+            if llm.prescreen is not None and not llm.prescreen.audit:
+                verdict = llm.prescreen.screen(instructions, answers, master.get('reference_answers') or (),
+                                               master.get('bad_answers') or ())
+                if verdict.action == 'reject':
+                    plan.screened += 1
+                    continue
+
+            if testcases:
+                previous_cells = reusable.get('cells', {}) if reusable else {}
+                pending = [tc for tc in testcases if grader._fingerprints[q_id]['testcases'][tc] not in previous_cells]
+                if not pending:
+                    plan.reused += 1
+                for testcase in pending:
+                    prompt, _ = build_testcase_prompt(instructions[0], answers[0], testcase, budget, llm.model)
+                    for model in voters:
+                        plan.add(model, count_tokens(prompt, model), 1, consistency * transport,
+                                 CONSISTENCY_ATTEMPTS * TRANSPORT_ATTEMPTS)
+            elif reusable and reusable.get('fingerprint') == grader._fingerprints[q_id]['question']:
+                plan.reused += 1
+            elif grader.pack_conceptual:
+                packed.append((q_id, instructions, answers, master.get('token_budget')))
+            else:
+                prompt, _ = build_feedback_prompt(instructions, answers, budget, llm.model)
+                plan.add(llm.model, count_tokens(prompt, llm.model), 1, transport, TRANSPORT_ATTEMPTS)
+
+        if len(packed) == 1:
+            q_id, instructions, answers, budget = packed[0]
+            prompt, _ = build_feedback_prompt(instructions, answers, budget or llm.token_budget, llm.model)
+            plans[q_id].add(llm.model, count_tokens(prompt, llm.model), 1, transport, TRANSPORT_ATTEMPTS)
+        elif packed:
+            # One request for all of them; its cost is split evenly between the questions
+            prompt, _ = build_packed_feedback_prompt(packed, llm.token_budget, llm.model)
+            share = 1 / len(packed)
+            for q_id, _, _, _ in packed:
+                plans[q_id].add(llm.model, count_tokens(prompt, llm.model), share, transport, TRANSPORT_ATTEMPTS)
+    return dict(plans)
+
+
+def project_wall_time(calls, tokens, concurrency=1, latency=3.0, rpm=None, tpm=None):
+    """Seconds to make `calls` requests: bounded by latency per concurrent slot and by the rate limits."""
+    bounds = [calls * latency / max(1, concurrency)]
+    if rpm:
+        bounds.append(calls / rpm * 60)
+    if tpm:
+        bounds.append(tokens / tpm * 60)
+    return max(bounds)
+
+
+def plan_cost(plans, model, prices=None):
+    """
+    Expected USD per model as {model: cost}, each model's tokens at its own price,
+    and the models with no known price. `prices` (input, output) replaces the
+    table's price for `model`, the grading model, and fills in any unlisted one.
+    """
+    tokens = defaultdict(lambda: [0.0, 0.0])
+    for plan in plans.values():
+        for name, (prompt, completion) in plan.tokens.items():
+            tokens[name][0] += prompt
+            tokens[name][1] += completion
+    costs, unpriced = {}, []
+    for name, (prompt, completion) in sorted(tokens.items()):
+        price = prices if prices and (name == model or name not in PRICES) else PRICES.get(name)
+        if price is None:
+            unpriced.append(name)
+        else:
+            costs[name] = (prompt * price[0] + completion * price[1]) / 1e6
+    return costs, unpriced
+
+
+def print_plan(plans, model, concurrency=1, latency=3.0, rpm=None, tpm=None, prices=None):
+    """Prints the per-question breakdown, totals, cost and projected wall time."""
+    print(f"\n--- Grading Plan ({model}) ---")
+    print(f"  {'question':<10} {'students':>8} {'reused':>7} {'screened':>8} {'calls':>9} {'max':>7} "
+          f"{'prompt tok':>11} {'compl. tok':>11}")
+    for q_id, plan in sorted(plans.items(), key=lambda item: int(item[0][1:]) if item[0][1:].isdigit() else item[0]):
+        print(f"  {q_id:<10} {plan.students:>8} {plan.reused:>7} {plan.screened:>8} {plan.calls:>9.1f} "
+              f"{plan.max_calls:>7.0f} {plan.prompt_tokens:>11.0f} {plan.completion_tokens:>11.0f}")
+
+    calls = sum(plan.calls for plan in plans.values())
+    max_calls = sum(plan.max_calls for plan in plans.values())
+    prompt_tokens = sum(plan.prompt_tokens for plan in plans.values())
+    completion_tokens = sum(plan.completion_tokens for plan in plans.values())
+    print(f"\n  Expected calls: {calls:.0f} (at most {max_calls:.0f} with every retry)")
+    print(f"  Expected tokens: {prompt_tokens:,.0f} prompt + {completion_tokens:,.0f} completion")
+    costs, unpriced = plan_cost(plans, model, prices)
+    if unpriced:
+        print(f"  Cost: no price known for {', '.join(repr(name) for name in unpriced)}; pass --price-in and --price-out")
+    elif costs:
+        breakdown = f" ({', '.join(f'{name} ${cost:,.2f}' for name, cost in costs.items())})" if len(costs) > 1 else ""
+        print(f"  Expected cost: ${sum(costs.values()):,.2f}{breakdown}")
+    seconds = project_wall_time(calls, prompt_tokens + completion_tokens, concurrency, latency, rpm, tpm)
+    limits = ", ".join(f"{value} {name}" for name, value in (('RPM', rpm), ('TPM', tpm)) if value)
+    print(f"  Projected wall time: {seconds / 60:,.1f} min at concurrency {concurrency}, {latency:.1f} s per call"
+          + (f", {limits}" if limits else ""))
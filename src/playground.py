@@ -1,7 +1,16 @@
 import ipywidgets as widgets
 from IPython.display import display, clear_output
+import io
 import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from LLM import LLM  # Corrected import
+from scheduler import BATCH, INTERACTIVE, SchedulerBusy, QuotaExceeded, share_scheduler
+from breaker import CircuitOpen, share_breakers
+from drafts import AttemptHistory, DraftLog, atomic_write_json
 import copy
 
 class Playground:
@@ -17,13 +26,45 @@ class Playground:
         self._userID = None
         self._whitelist = []
         # used for LLM grading. The LLM class now handles the API key.
+        share_scheduler() # Every student's kernel and grade.py queue for the same API slots
+        share_breakers()  # and fail fast together once one of them finds a model down
         self._model = "gpt-4o-mini"
-        self.llm = LLM(model=self._model)
+        self.llm = self._create_llm(self._model)
+        # autosave: changed questions are appended to a draft log once the student pauses typing
+        self.autosave_delay = 2.0
+        self._draft_log = None
+        self._unsaved = set()     # questions edited since the last autosave
+        self._stale = set()       # questions whose cached submission JSON is out of date
+        self._submission = {}     # q_id -> cached convertToJSON entry
+        self._autosave_timer = None
+        self._autosave_lock = threading.Lock()
+        self._restoring = False
+        self.history_size = 5     # Test attempts kept in memory per question; older ones go to attempts_<id>.jsonl.gz
+        # speculative pre-grading (opt-in): answers left unchanged for a while are graded in the background
+        self.speculative = False
+        self.speculate_delay = 3.0       # seconds an answer must stay unchanged before it is pre-graded
+        self.speculate_interval = 20.0   # minimum seconds between two background gradings for this student
+        self._speculations = OrderedDict() # (q_id, draft hash) -> Future of the grading result
+        self._speculate_timers = {}
+        self._speculate_lock = threading.Lock()
+        self._last_speculation = 0.0
+        self._speculator = None          # batch-priority LLM for background grading
+        self._speculation_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="speculate")
 
     def set_model(self, model):
-        """Sets the model for the LLM and re-initializes it."""
+        """Sets the model for the LLM, keeping its pooled client and scheduling context."""
         self._model = model
-        self.llm = LLM(model=model)
+        self.llm.set_model(model)
+        with self._speculate_lock:
+            self._speculator = None
+            self._speculations.clear() # Pre-graded with the previous model
+
+    def _create_llm(self, model):
+        """Creates an LLM whose calls are scheduled as interactive and charged to this student."""
+        llm = LLM(model=model)
+        llm.priority = INTERACTIVE
+        llm.student_id = self._userID
+        return llm
 
     def add_whitelist(self, userID):
         """Temporary whitelist, should not be visible to student in a real scenario."""
@@ -33,6 +74,12 @@ class Playground:
         """Used to verify if an acceptable userID was inputted."""
         self._verified = userID in self._whitelist
         self._userID = userID
+        self.llm.student_id = userID
+        with self._speculate_lock:
+            self._speculations.clear() # Graded for the previous student
+        if self._verified:
+            self._draft_log = DraftLog(f"drafts_{userID}.jsonl")
+            self.restore_drafts()
 
     def __isVerified(self):
         return self._verified
@@ -88,13 +135,127 @@ class Playground:
             self._displayable[self._curr_question]['instructions'] = []
             self._displayable[self._curr_question]['answers'] = []
 
-        self._displayable[self._curr_question]['instructions'].append(self.create_label(value=instruction))
-        self._displayable[self._curr_question]['answers'].append(self.create_textarea(value=initial_value))
+        q_id = self._curr_question
+        answer_widget = self.create_textarea(value=initial_value)
+        answer_widget.observe(lambda change: self._answer_changed(q_id), names='value')
+        self._displayable[q_id]['instructions'].append(self.create_label(value=instruction))
+        self._displayable[q_id]['answers'].append(answer_widget)
+        self._stale.add(q_id)
 
         if testcases:
             if not isinstance(testcases, list):
                 testcases = [testcases]
-            self._displayable[self._curr_question]['testcases'] = self.create_dropdown(options=testcases)
+            self._displayable[q_id]['testcases'] = self.create_dropdown(options=testcases)
+            self._displayable[q_id]['testcases'].observe(lambda change: self._testcase_selected(q_id), names='value')
+
+    def _answer_changed(self, q_id):
+        """Marks a question dirty and (re)starts the debounce timer for autosave."""
+        with self._autosave_lock:
+            self._stale.add(q_id)
+            if self._restoring:
+                return
+            self._unsaved.add(q_id)
+            if self._autosave_timer is not None:
+                self._autosave_timer.cancel()
+            self._autosave_timer = threading.Timer(self.autosave_delay, self.save_drafts)
+            self._autosave_timer.daemon = True
+            self._autosave_timer.start()
+        if self.speculative:
+            self._schedule_speculation(q_id)
+
+    def _testcase_selected(self, q_id):
+        self._stale.add(q_id)
+        if self.speculative:
+            self._schedule_speculation(q_id)
+
+    def _draft_key(self, q_id):
+        """Identifies what a grading result depends on: the answers and the selected test case."""
+        content = self.convertToText(self._displayable[q_id])
+        digest = hashlib.sha256(json.dumps([content['answers'], content.get('testcases')]).encode('utf-8')).hexdigest()
+        return q_id, digest
+
+    def _schedule_speculation(self, q_id, delay=None):
+        """(Re)starts the timer that pre-grades q_id once its answer has been stable for speculate_delay."""
+        with self._speculate_lock:
+            timer = self._speculate_timers.pop(q_id, None)
+            if timer is not None:
+                timer.cancel()
+            timer = threading.Timer(self.speculate_delay if delay is None else delay, self._speculate, args=(q_id,))
+            timer.daemon = True
+            self._speculate_timers[q_id] = timer
+            timer.start()
+
+    def _speculate(self, q_id):
+        """Starts grading the current draft of q_id in the background, unless it is cached or rate-limited."""
+        if not (self.speculative and self.__isVerified()):
+            return
+        key = self._draft_key(q_id)
+        content = self.convertToText(self._displayable[q_id])
+        if not any(answer.strip() for answer in content['answers']):
+            return
+        with self._speculate_lock:
+            if key in self._speculations:
+                return
+            wait = self._last_speculation + self.speculate_interval - time.monotonic()
+            if wait <= 0:
+                self._last_speculation = time.monotonic()
+                if self._speculator is None:
+                    self._speculator = self._create_llm(self._model)
+                    self._speculator.priority = BATCH # Never ahead of a student's Test click
+                # A budget of its own, so background grading never uses up the quota the student's Test clicks need
+                self._speculator.student_id = f"{self._userID} (speculative)"
+                self._speculations[key] = self._speculation_pool.submit(self._grade_captured, content, self._speculator)
+                while len(self._speculations) > 32:
+                    self._speculations.popitem(last=False)
+        if wait > 0: # Rate-limited: try again once allowed, if the answer is still unchanged by then
+            self._schedule_speculation(q_id, wait)
+
+    def _grade(self, content, llm, stream):
+        if 'testcases' in content and content['testcases']:
+            # This is a single-instruction question with test cases
+            return llm.grade_one_question(content['instructions'], content['answers'], content['testcases'], stream=stream)
+        # This is a multi-instruction conceptual question
+        return llm.grade_multiple_question(content['instructions'], content['answers'], stream=stream)
+
+    def _grade_captured(self, content, llm):
+        """Grades without touching the notebook, returning the result and the feedback a live Test would have shown."""
+        llm.output = io.StringIO()
+        try:
+            return self._grade(content, llm, True), llm.output.getvalue()
+        finally:
+            llm.output = None
+
+    def _speculative_result(self, q_id):
+        """(result, feedback) graded in the background for q_id's current draft, waiting for it if still running; or None."""
+        with self._speculate_lock:
+            future = self._speculations.get(self._draft_key(q_id))
+        if future is None:
+            return None
+        try:
+            return future.result()
+        except Exception: # Busy, over quota, circuit open or failed: grade it live instead
+            return None
+
+    def save_drafts(self):
+        """Appends the answers of questions edited since the last autosave to the draft log."""
+        with self._autosave_lock:
+            if self._draft_log is None:
+                return # Not verified yet; keep the edits pending
+            drafts = {q_id: [ans.value for ans in self._displayable[q_id]['answers']] for q_id in self._unsaved}
+            self._unsaved.clear()
+            self._autosave_timer = None
+        self._draft_log.append(drafts)
+
+    def restore_drafts(self):
+        """Loads answers saved by autosave, e.g. after a kernel restart."""
+        drafts = self._draft_log.latest()
+        self._restoring = True
+        try:
+            for q_id, answers in drafts.items():
+                for widget, value in zip(self._displayable.get(q_id, {}).get('answers', []), answers):
+                    widget.value = value
+        finally:
+            self._restoring = False
 
     def displayAll(self):
         curr_question_widgets = self._displayable[self._curr_question]
@@ -127,15 +288,21 @@ class Playground:
 
             print("--- Grading your answer... ---")
 
-            if 'testcases' in content and content['testcases']:
-                # This is a single-instruction question with test cases
-                time, rates, avg_rates, test_history = self.llm.grade_one_question(content['instructions'], content['answers'], content['testcases'], stream=True)
+            speculated = self._speculative_result(question_id) if self.speculative else None
+            if speculated is not None:
+                result, feedback = speculated
+                print("--- Graded in the background while you were editing ---")
+                print(feedback, end='')
             else:
-                # This is a multi-instruction conceptual question
-                time, rates, avg_rates, test_history = self.llm.grade_multiple_question(content['instructions'], content['answers'], stream=True)
+                try:
+                    result = self._grade(content, self.llm, True)
+                except (SchedulerBusy, QuotaExceeded, CircuitOpen) as e:
+                    print(f"\n{e}")
+                    return
+            time, rates, avg_rates, test_history = result
 
             if 'test_history' not in self._displayable[question_id]:
-                self._displayable[question_id]['test_history'] = []
+                self._displayable[question_id]['test_history'] = AttemptHistory(question_id, f"attempts_{self._userID}.jsonl.gz", keep=self.history_size)
 
             dict_output = {
                 'time': time,
@@ -144,6 +311,7 @@ class Playground:
                 'test_history': test_history
             }
             self._displayable[question_id]['test_history'].append(dict_output)
+            self._stale.add(question_id)
 
     def convertToText(self, curr_question_widgets):
         dict_output = {}
@@ -158,24 +326,31 @@ class Playground:
 
         return dict_output
 
-    def convertToJSON(self):
+    def questionToJSON(self, q_id):
+        widgets_dict = self._displayable[q_id]
         json_output = {}
-        for q_id, widgets_dict in self._displayable.items():
-            json_output[q_id] = {}
 
-            if 'question' in widgets_dict:
-                json_output[q_id]['question'] = widgets_dict['question'].value
+        if 'question' in widgets_dict:
+            json_output['question'] = widgets_dict['question'].value
 
-            json_output[q_id]['instructions'] = [instr.value for instr in widgets_dict['instructions']]
-            json_output[q_id]['answers'] = [ans.value for ans in widgets_dict['answers']]
+        json_output['instructions'] = [instr.value for instr in widgets_dict['instructions']]
+        json_output['answers'] = [ans.value for ans in widgets_dict['answers']]
 
-            if 'testcases' in widgets_dict:
-                json_output[q_id]['testcases'] = [widgets_dict['testcases'].value]
+        if 'testcases' in widgets_dict:
+            json_output['testcases'] = [widgets_dict['testcases'].value]
 
-            if 'test_history' in widgets_dict:
-                json_output[q_id]['test_history'] = widgets_dict['test_history']
+        if 'test_history' in widgets_dict:
+            json_output['test_history'] = list(widgets_dict['test_history'].recent)
+            json_output['test_summary'] = widgets_dict['test_history'].summary()
         return json_output
 
+    def convertToJSON(self):
+        """Submission JSON for all questions, re-serializing only questions that changed since the last call."""
+        for q_id in list(self._stale):
+            self._stale.discard(q_id)
+            self._submission[q_id] = self.questionToJSON(q_id)
+        return {q_id: self._submission[q_id] for q_id in self._displayable}
+
     def store_final_answer(self):
         """Creates a submit button that saves all answers to a local JSON file."""
         output_widget = widgets.Output()
@@ -187,11 +362,14 @@ class Playground:
                     print("Cannot submit without a user ID. Please verify first.")
                     return
 
+                if self._draft_log is not None:
+                    self.save_drafts()
+                    self._draft_log.compact() # The submission now holds everything; keep one record per question
+
                 json_data = self.convertToJSON()
-                # Save the file in the current directory (where the notebook is)
+                # Save the file in the current directory (where the notebook is), replacing it atomically
                 filename = f"answers_{self._userID}.json"
-                with open(filename, 'w', encoding='utf-8') as f:
-                    json.dump(json_data, f, indent=4)
+                atomic_write_json(filename, json_data)
                 print(f"Submission successful! Answers saved to {filename}")
 
         button_widget = self.create_button("Submit Assignment", on_click=lambda b: format_and_write(output_widget))
@@ -0,0 +1,135 @@
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+
+# Placeholder answers that are never a correct answer to any question. Words that can be one, such as
+# "none", "pass" or "nothing", belong in a question's own "bad_answers" list where they are placeholders.
+KNOWN_BAD_ANSWERS = [
+    "idk", "i don't know", "i dont know", "no idea", "todo", "tbd", "asdf", "qwerty", "lorem ipsum",
+]
+
+
+def normalize(text):
+    return re.sub(r"\s+", " ", text.lower()).strip()
+
+
+def char_ngrams(text, sizes=(3, 4, 5)):
+    """Counts of the character n-grams of normalized text, padded so short words still produce n-grams."""
+    padded = f" {normalize(text)} "
+    return Counter(padded[i:i + n] for n in sizes for i in range(len(padded) - n + 1))
+
+
+def tfidf_similarity(query, documents, sizes=(3, 4, 5)):
+    """
+    Cosine similarity between query and each document over TF-IDF weighted
+    character n-grams (sublinear tf, smoothed idf), as a NumPy array.
+    """
+    grams = [char_ngrams(text, sizes) for text in [query, *documents]]
+    vocabulary = {}
+    for counts in grams:
+        for gram in counts:
+            vocabulary.setdefault(gram, len(vocabulary))
+    if not documents or not vocabulary:
+        return np.zeros(len(documents))
+
+    matrix = np.zeros((len(grams), len(vocabulary)))
+    for row, counts in enumerate(grams):
+        matrix[row, [vocabulary[g] for g in counts]] = list(counts.values())
+    df = np.count_nonzero(matrix, axis=0)
+    idf = np.log((1 + len(grams)) / (1 + df)) + 1
+    matrix = np.log1p(matrix) * idf
+    norms = np.linalg.norm(matrix, axis=1)
+    norms[norms == 0] = 1.0
+    matrix /= norms[:, None]
+    return matrix[1:] @ matrix[0]
+
+
+class Verdict:
+    """Outcome of screening one answer: action is 'reject', 'match' or None (send to the LLM as usual)."""
+
+    def __init__(self, action=None, reason=None, score=None):
+        self.action = action
+        self.reason = reason
+        self.score = score
+
+    def __str__(self):
+        score = f" (similarity {self.score:.2f})" if self.score is not None else ""
+        if self.action == 'reject':
+            return f"Pre-screen: answer rejected without an LLM call, {self.reason}{score}."
+        return f"Pre-screen: {self.reason}{score}."
+
+
+class PreScreen:
+    """
+    Local lexical checks run before any LLM call. Empty answers, placeholders
+    and copies of the instruction are rejected; answers close to an instructor
+    reference answer are tagged as likely correct but still graded. Length
+    alone never rejects an answer: "42" or "O(n)" can be entirely correct.
+
+    With audit=True rejected answers are graded by the LLM anyway, and every
+    decision is compared with the LLM verdict so report() can show the
+    precision of each rule for tuning the thresholds.
+    """
+
+    def __init__(self, placeholder_threshold=0.8, copy_threshold=0.85, match_threshold=0.9,
+                 known_bad=KNOWN_BAD_ANSWERS, audit=False):
+        self.placeholder_threshold = placeholder_threshold
+        self.copy_threshold = copy_threshold
+        self.match_threshold = match_threshold
+        self.known_bad = list(known_bad)
+        self.audit = audit
+        self._lock = threading.Lock()
+        self.decisions = Counter()  # reason -> answers screened out or tagged
+        self.screened = 0
+        self._audits = {}           # rule -> [agreed with the LLM, audited]
+
+    def screen(self, instructions, answers, references=(), bad_answers=()):
+        """Screens a question's answers (one per instruction) and returns a Verdict."""
+        answer = "\n".join(a for a in answers if a)
+        text = normalize(answer)
+        verdict = Verdict()
+        if not re.sub(r"[\W_]", "", text):
+            verdict = Verdict('reject', 'empty')
+        else:
+            checks = [('reject', 'placeholder answer', [*self.known_bad, *bad_answers], self.placeholder_threshold),
+                      ('reject', 'copies the instruction', list(instructions), self.copy_threshold),
+                      ('match', 'close to a reference answer', list(references), self.match_threshold)]
+            for action, reason, documents, threshold in checks:
+                if not documents:
+                    continue
+                score = float(tfidf_similarity(answer, documents).max())
+                if score >= threshold:
+                    verdict = Verdict(action, reason, score)
+                    break
+        with self._lock:
+            self.screened += 1
+            if verdict.action:
+                self.decisions[verdict.reason] += 1
+        return verdict
+
+    def record(self, verdict, accepted):
+        """Compares a screening decision with the LLM's verdict for the same answer."""
+        if not verdict.action:
+            return
+        agreed = (verdict.action == 'reject') != accepted
+        with self._lock:
+            counts = self._audits.setdefault(verdict.reason, [0, 0])
+            counts[0] += agreed
+            counts[1] += 1
+
+    def precision(self):
+        """{reason: fraction of audited decisions the LLM agreed with}."""
+        with self._lock:
+            return {reason: agreed / total for reason, (agreed, total) in self._audits.items() if total}
+
+    def print_report(self):
+        print("\n--- Pre-screen ---")
+        print(f"  {self.screened} answers screened")
+        precision = self.precision()
+        for reason, count in self.decisions.most_common():
+            audited = self._audits.get(reason, [0, 0])[1]
+            agreement = f"precision {precision[reason]:.1%} over {audited} audited" if reason in precision \
+                else "precision not measured (run with audit enabled)"
+            print(f"  {reason:<28} {count:>6}  {agreement}")
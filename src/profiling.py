@@ -0,0 +1,62 @@
+import os
+import json
+import time
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+class Profiler:
+    """
+    Records named stages with a monotonic clock and writes them as a Chrome
+    trace (open in chrome://tracing or https://ui.perfetto.dev). Disabled by
+    default, in which case stage() costs almost nothing.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._events = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+
+    @contextmanager
+    def stage(self, name, **args):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            event = {'name': name, 'ph': 'X', 'pid': os.getpid(), 'tid': threading.get_ident(),
+                     'ts': (start - self._origin) / 1000, 'dur': (end - start) / 1000}
+            if args:
+                event['args'] = {key: str(value) for key, value in args.items()}
+            with self._lock:
+                self._events.append(event)
+
+    def totals(self):
+        """{stage: (count, total seconds)} over everything recorded so far."""
+        totals = defaultdict(lambda: [0, 0.0])
+        with self._lock:
+            for event in self._events:
+                totals[event['name']][0] += 1
+                totals[event['name']][1] += event['dur'] / 1e6
+        return {name: tuple(value) for name, value in totals.items()}
+
+    def print_summary(self):
+        print("\n--- Stage Timings ---")
+        for name, (count, seconds) in sorted(self.totals().items(), key=lambda item: -item[1][1]):
+            print(f"  {name:<16} {count:>6} calls  {seconds:>10.3f} s")
+
+    def write(self, path):
+        with self._lock:
+            trace = {'traceEvents': list(self._events), 'displayTimeUnit': 'ms'}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(trace, f)
+        print(f"Trace written to {path}")
+
+
+# Process-wide profiler; grade.py --profile enables it
+profiler = Profiler()
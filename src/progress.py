@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import tempfile
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+
+class Progress:
+    """
+    Live counters for a grading run: work items (test case cells and
+    conceptual questions) done out of the total, students, API calls, tokens,
+    retries and rate limits. status() gives a snapshot with throughput over a
+    sliding window and a moving-average ETA; report() publishes it to the
+    terminal, a JSON status file and/or a callback while grading runs.
+    """
+
+    def __init__(self, window=60.0):
+        self.window = window
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self, total=0, students=0):
+        with self._lock:
+            self.total = total
+            self.students = students
+            self.completed = 0
+            self.students_done = 0
+            self.calls = 0
+            self.tokens = 0
+            self.retries = 0
+            self.rate_limited = 0
+            self.failures = 0
+            self.finished = False
+            self._started = time.monotonic()
+            self._items = deque([(self._started, 0)])  # (time, completed) samples for the ETA
+            self._token_log = deque()                  # (time, tokens) of recent calls
+
+    def advance(self, items=1):
+        with self._lock:
+            self.completed += items
+            self._items.append((time.monotonic(), self.completed))
+
+    def student_done(self, skipped_items=0):
+        """Counts a student as graded; skipped_items are their work items that needed no grading (unanswered)."""
+        with self._lock:
+            self.students_done += 1
+            if skipped_items:
+                self.completed += skipped_items
+                self._items.append((time.monotonic(), self.completed))
+
+    def record_call(self, tokens):
+        with self._lock:
+            self.calls += 1
+            self.tokens += tokens
+            self._token_log.append((time.monotonic(), tokens))
+
+    def record_retry(self, error):
+        with self._lock:
+            self.retries += 1
+            if getattr(error, 'status_code', None) == 429 or "rate limit" in str(error).lower():
+                self.rate_limited += 1
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+
+    def status(self):
+        """A JSON-serializable snapshot of the run."""
+        now = time.monotonic()
+        with self._lock:
+            cutoff = now - self.window
+            while len(self._items) > 1 and self._items[1][0] < cutoff:
+                self._items.popleft()
+            while self._token_log and self._token_log[0][0] < cutoff:
+                self._token_log.popleft()
+            elapsed = now - self._started
+            since, done_then = self._items[0]
+            rate = (self.completed - done_then) / (now - since) if now > since else 0.0
+            remaining = max(0, self.total - self.completed)
+            attempts = self.calls + self.retries + self.failures
+            span = min(self.window, elapsed) or 1.0
+            return {
+                'completed': self.completed,
+                'total': self.total,
+                'students_done': self.students_done,
+                'students': self.students,
+                'elapsed_seconds': round(elapsed, 1),
+                'calls': self.calls,
+                'calls_per_second': round(self.calls / elapsed, 2) if elapsed else 0.0,
+                'tokens': self.tokens,
+                'tokens_per_minute': round(sum(tokens for _, tokens in self._token_log) / span * 60),
+                'retries': self.retries,
+                'rate_limited': self.rate_limited,
+                'failures': self.failures,
+                'error_rate': round((self.retries + self.failures) / attempts, 3) if attempts else 0.0,
+                'eta_seconds': round(remaining / rate) if rate > 0 else None,
+                'finished': self.finished,
+                'updated': time.time(),
+            }
+
+    @staticmethod
+    def format_status(status):
+        eta = status['eta_seconds']
+        eta = "--:--" if eta is None else f"{eta // 60:.0f}:{eta % 60:02.0f}"
+        percent = status['completed'] / status['total'] if status['total'] else 0.0
+        return (f"{status['completed']}/{status['total']} items ({percent:.0%}), "
+                f"{status['students_done']}/{status['students']} students | "
+                f"{status['calls_per_second']:.2f} calls/s, {status['tokens_per_minute']:,} tok/min | "
+                f"{status['retries']} retries ({status['rate_limited']} rate-limited), {status['failures']} failed | "
+                f"ETA {eta}")
+
+    def _publish(self, status_path, stream, callback):
+        status = self.status()
+        if status_path:
+            directory = os.path.dirname(os.path.abspath(status_path))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(status, f, indent=2)
+            os.replace(tmp_path, status_path) # Pollers never see a half-written file
+        if stream is not None:
+            stream.write("\r\033[K" + self.format_status(status) if stream.isatty() else self.format_status(status) + "\n")
+            stream.flush()
+        if callback is not None:
+            callback(status)
+
+    @contextmanager
+    def report(self, status_path=None, stream=None, callback=None, interval=1.0):
+        """Publishes status every `interval` seconds while the block runs, and once more at the end."""
+        stop = threading.Event()
+
+        def loop():
+            while not stop.wait(interval):
+                self._publish(status_path, stream, callback)
+
+        thread = threading.Thread(target=loop, name="progress", daemon=True)
+        thread.start()
+        try:
+            yield self
+        finally:
+            stop.set()
+            thread.join()
+            with self._lock:
+                self.finished = True
+            self._publish(status_path, stream, callback)
+            if stream is not None and stream.isatty():
+                stream.write("\n")
+
+
+# Process-wide progress counters; grade.py --progress and Grader.run display them
+progress = Progress()
@@ -0,0 +1,222 @@
+import re
+import textwrap
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:  # Fall back to a character-based estimate
+    tiktoken = None
+
+# Default number of tokens of student text allowed into one question's prompt
+ANSWER_TOKEN_BUDGET = 1500
+# Expected length of a grading completion, used when estimating the cost of a call
+COMPLETION_TOKENS = 300
+
+
+@lru_cache(maxsize=None)
+def _encoding(model):
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:  # Not an OpenAI model name
+            return tiktoken.get_encoding("o200k_base")
+    except Exception:  # Encoding files missing and cannot be downloaded (offline)
+        return None
+
+
+def count_tokens(text, model="gpt-4o-mini"):
+    """Counts tokens with the model's local tokenizer, or estimates ~4 characters per token without one."""
+    encoding = _encoding(model)
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def estimate_tokens(prompt, model="gpt-4o-mini", completion_tokens=COMPLETION_TOKENS):
+    """Total tokens a call is expected to use: the prompt plus a typical completion."""
+    return count_tokens(prompt, model) + completion_tokens
+
+
+def compact(template):
+    """Removes template indentation and blank-line runs, which are billed as tokens but carry no meaning."""
+    text = textwrap.dedent(template).strip()
+    return re.sub(r"\n{3,}", "\n\n", text)
+
+
+def fit_to_budget(text, budget, model="gpt-4o-mini"):
+    """
+    Deterministically truncates text to at most `budget` tokens, keeping the
+    first two thirds and the last third. Returns (text, notice); notice is None
+    when nothing was removed.
+    """
+    total = count_tokens(text, model)
+    if budget is None or total <= budget:
+        return text, None
+    removed = total - budget
+    encoding = _encoding(model)
+    head = budget * 2 // 3
+    tail = budget - head
+    if encoding is None:
+        chars = len(text) * budget // total
+        head_chars = chars * 2 // 3
+        tail_chars = chars - head_chars
+        head_text, tail_text = text[:head_chars], text[len(text) - tail_chars:] if tail_chars else ""
+    else:
+        tokens = encoding.encode(text, disallowed_special=())
+        head_text = encoding.decode(tokens[:head])
+        tail_text = encoding.decode(tokens[len(tokens) - tail:]) if tail else ""
+    notice = f"[Answer truncated: {removed} of {total} tokens removed to fit the {budget}-token budget]"
+    return f"{head_text} [...] {tail_text}", notice
+
+
+# Templates are dedented once at import; student text is substituted afterwards so
+# that its own line breaks cannot defeat the dedent.
+TESTCASE_TEMPLATE = compact("""
+    You are a teaching assistant evaluating a student's answer to a computer science question.
+
+    Question instruction: "{instruction}"
+    Student's answer: "{student_full_answer}"
+
+    Your task is to determine if the student's answer correctly applies to the following test case: "{testcase}".
+
+    Think step-by-step and provide a brief explanation of why the student's answer succeeds or fails for this specific test case. Conclude your entire response with a single word: "Correct" if it succeeds, or "Incorrect" if it fails.
+    """)
+
+FEEDBACK_TEMPLATE = compact("""
+    You are a helpful teaching assistant providing feedback on a multi-part computer science question.
+    Below are the instructions the student was given and their corresponding answers.
+
+    {full_context}
+
+    Your task is to:
+    1. Review all the student's answers in the context of the instructions.
+    2. Provide constructive feedback on each part.
+    3. Explain what they did well and where they can improve.
+    4. Do NOT give the direct, correct answer. Guide the student toward it.
+
+    Please provide your feedback now.
+    """)
+
+
+def build_testcase_prompt(instruction, student_answer, testcase, budget=ANSWER_TOKEN_BUDGET, model="gpt-4o-mini"):
+    """Prompt that checks one answer against one test case. Returns (prompt, notice)."""
+    answer, notice = fit_to_budget(student_answer, budget, model)
+    student_full_answer = f"The student's explanation is: '{answer}'. "
+    prompt = TESTCASE_TEMPLATE.format(instruction=instruction, student_full_answer=student_full_answer, testcase=testcase)
+    return prompt, notice
+
+
+VERDICT = re.compile(r"\b(correct|incorrect)\W*$", re.IGNORECASE)
+
+
+def parse_verdict(evaluation):
+    """True if a test case evaluation ends in "Correct", False for "Incorrect", None if it ends in neither."""
+    match = VERDICT.search(evaluation[-40:])
+    if match is None:
+        return None
+    return match.group(1).lower() == "correct"
+
+
+def build_feedback_context(instructions, student_answers, budget=ANSWER_TOKEN_BUDGET, model="gpt-4o-mini"):
+    """
+    Pairs each instruction with its answer, splitting the question's budget
+    evenly between the parts. Returns (context, notices).
+    """
+    notices = []
+    full_context = ""
+    part_budget = budget // max(1, len(instructions)) if budget else None
+    for i, instruction in enumerate(instructions):
+        answer = student_answers[i] if i < len(student_answers) else "[No answer provided]"
+        answer, notice = fit_to_budget(answer, part_budget, model)
+        if notice:
+            notices.append(f"Part {i+1}: {notice}")
+        full_context += f"Instruction {i+1}: {instruction}\nStudent's Answer {i+1}: {answer}\n\n"
+    return full_context.strip(), notices
+
+
+def build_feedback_prompt(instructions, student_answers, budget=ANSWER_TOKEN_BUDGET, model="gpt-4o-mini"):
+    """Prompt asking for holistic feedback on a multi-part question. Returns (prompt, notices)."""
+    full_context, notices = build_feedback_context(instructions, student_answers, budget, model)
+    return FEEDBACK_TEMPLATE.format(full_context=full_context), notices
+
+
+PACKED_FEEDBACK_TEMPLATE = compact("""
+    You are a helpful teaching assistant providing feedback on several computer science questions answered by one student.
+    Each question below lists the instructions the student was given and their corresponding answers.
+
+    {questions}
+
+    For EACH question, separately:
+    1. Review all the student's answers in the context of the instructions.
+    2. Provide constructive feedback on each part.
+    3. Explain what they did well and where they can improve.
+    4. Do NOT give the direct, correct answer. Guide the student toward it.
+
+    Start the feedback for each question with a line of the form "=== FEEDBACK <question id> ===" (for example "=== FEEDBACK {first_id} ==="), and give feedback for every question, in order.
+    """)
+
+PACKED_FEEDBACK_MARKER = re.compile(r"^=+\s*FEEDBACK\s+(\S+?)\s*=+\s*$", re.MULTILINE)
+
+
+def build_packed_feedback_prompt(questions, budget=ANSWER_TOKEN_BUDGET, model="gpt-4o-mini"):
+    """
+    One prompt asking for feedback on several conceptual questions.
+    questions is a list of (q_id, instructions, answers, budget or None).
+    Returns (prompt, {q_id: notices}).
+    """
+    blocks = []
+    notices = {}
+    for q_id, instructions, answers, question_budget in questions:
+        context, notices[q_id] = build_feedback_context(instructions, answers, question_budget or budget, model)
+        blocks.append(f"### Question {q_id}\n{context}")
+    prompt = PACKED_FEEDBACK_TEMPLATE.format(questions="\n\n".join(blocks), first_id=questions[0][0])
+    return prompt, notices
+
+
+COMPARE_BATCH_TEMPLATE = compact("""
+    For each numbered item below, decide whether the text correctly addresses the given concept.
+
+    {items}
+
+    Respond with exactly one line per item, in order, of the form "<number>: Yes" or "<number>: No", and nothing else.
+    """)
+
+COMPARE_VERDICT = re.compile(r"^\W*(\d+)\W+(yes|no)\b", re.IGNORECASE | re.MULTILINE)
+
+
+def build_compare_prompt(pairs):
+    """
+    One prompt checking several (text, concept) pairs. When every pair shares
+    the same text, it is included only once.
+    """
+    texts = {text for text, _ in pairs}
+    if len(texts) == 1:
+        concepts = "\n".join(f"{i}. Concept: \"{concept}\"" for i, (_, concept) in enumerate(pairs, 1))
+        items = f"Text (the same for every item): \"{pairs[0][0]}\"\n\n{concepts}"
+    else:
+        items = "\n\n".join(f"{i}. Text: \"{text}\"\n   Concept: \"{concept}\"" for i, (text, concept) in enumerate(pairs, 1))
+    return COMPARE_BATCH_TEMPLATE.format(items=items)
+
+
+def parse_compare_verdicts(response, count):
+    """{item index (0-based): bool} for the numbered Yes/No lines in a response; unparsable items are left out."""
+    verdicts = {}
+    for match in COMPARE_VERDICT.finditer(response):
+        index = int(match.group(1)) - 1
+        if 0 <= index < count and index not in verdicts:
+            verdicts[index] = match.group(2).lower() == "yes"
+    return verdicts
+
+
+def split_packed_feedback(response, q_ids):
+    """Splits a packed response into {q_id: feedback}; questions without a block are left out."""
+    feedback = {}
+    markers = list(PACKED_FEEDBACK_MARKER.finditer(response))
+    for i, marker in enumerate(markers):
+        q_id = marker.group(1).strip('"\'*:')
+        end = markers[i + 1].start() if i + 1 < len(markers) else len(response)
+        if q_id in q_ids and q_id not in feedback:
+            feedback[q_id] = response[marker.end():end].strip()
+    return feedback
@@ -0,0 +1,62 @@
+import os
+import json
+import tempfile
+import textwrap
+
+
+class ResultWriter:
+    """
+    Streams {student_id: result} entries into a JSON results file as they are
+    graded, so results need not be kept in memory until the end. Entries go to a
+    temporary file that replaces the results file when the writer is closed,
+    including after an error or Ctrl+C, so completed students are never lost.
+    With merge=True, entries already in the file for other students are kept.
+    The same happens when the run did not finish (an exception, or the caller
+    set complete = False after skipping students), so earlier results for the
+    students it did not reach are not dropped.
+    """
+
+    def __init__(self, path, merge=False):
+        self.path = path
+        self.merge = merge
+        self.complete = True
+        self.count = 0
+        self._written = set()
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, self._tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+        self._file = os.fdopen(fd, 'w', encoding='utf-8')
+        self._file.write("{")
+
+    def add(self, student_id, result):
+        # Same layout as json.dump(..., indent=4) of the whole mapping
+        entry = textwrap.indent(json.dumps(result, indent=4), "    ").lstrip()
+        self._file.write(f"{',' if self.count else ''}\n    {json.dumps(student_id)}: {entry}")
+        self._file.flush()
+        self._written.add(student_id)
+        self.count += 1
+
+    def close(self):
+        if self._file.closed:
+            return
+        if self.merge or not self.complete:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    existing = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                existing = {}
+            for student_id, result in existing.items():
+                if student_id not in self._written:
+                    self.add(student_id, result)
+        self._file.write("\n}" if self.count else "}")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.complete = False
+        self.close()
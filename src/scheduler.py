@@ -0,0 +1,322 @@
+import os
+import json
+import time
+import uuid
+import threading
+import itertools
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from profiling import profiler
+
+try:
+    import fcntl
+except ImportError:  # Not POSIX; every process then keeps its own Scheduler
+    fcntl = None
+
+# Priority classes: lower values are served first.
+INTERACTIVE = 0
+BATCH = 1
+
+# Where Playground kernels and grade.py runs on this machine meet, unless LLM_SCHEDULER_FILE says otherwise.
+# A subfolder, so that writing it does not wake grade.py --watch, which watches result/ itself.
+SHARED_STATE = Path(__file__).resolve().parent.parent / "result" / ".scheduler" / "state.json"
+
+
+class SchedulerBusy(RuntimeError):
+    """Raised when a request's queue is full and the caller asked not to wait."""
+
+
+class RequestAbandoned(RuntimeError):
+    """Raised in a request that was abandoned (see Scheduler.abandon) while it waited for a slot."""
+
+
+class QuotaExceeded(RuntimeError):
+    """Raised when a student has used up their fair share of tokens for the current window."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _quota_exceeded(seconds):
+    retry_after = max(1, int(seconds))
+    return QuotaExceeded(f"You have used your feedback quota for now. Please try again in about {retry_after} seconds.",
+                         retry_after)
+
+
+def _scheduler_busy(waiting):
+    return SchedulerBusy(f"The grader is busy right now ({waiting} requests waiting). Please try again in a moment.")
+
+
+class Scheduler:
+    """
+    Admission control in front of the LLM API. Callers wait for a slot; waiting
+    requests are served by priority class, then by how few tokens their student
+    used recently, then in arrival order. Each student also has a token quota
+    over a sliding window, and each priority class has a bounded queue.
+    """
+
+    def __init__(self, max_concurrency=4, max_queue=32, student_token_quota=30000, window=600):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.student_token_quota = student_token_quota
+        self.window = window
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = []
+        self._usage = {}  # student -> deque of (timestamp, tokens)
+        self._seq = itertools.count()
+        self._held = set() # cancel events of abandonable requests holding a slot
+
+    def _recent_usage(self, student):
+        if student is None:
+            return 0
+        usage = self._usage.setdefault(student, deque())
+        cutoff = time.monotonic() - self.window
+        while usage and usage[0][0] < cutoff:
+            usage.popleft()
+        return sum(tokens for _, tokens in usage)
+
+    def _check_quota(self, student, tokens):
+        if student is None or not self.student_token_quota:
+            return
+        if self._recent_usage(student) + tokens > self.student_token_quota:
+            oldest = self._usage[student][0][0] if self._usage[student] else time.monotonic()
+            raise _quota_exceeded(oldest + self.window - time.monotonic())
+
+    def _queued(self, priority):
+        return sum(1 for ticket in self._waiting if ticket[0] == priority)
+
+    def _next(self):
+        return min(self._waiting, key=lambda t: (t[0], self._recent_usage(t[2]), t[1]))
+
+    @contextmanager
+    def slot(self, priority=BATCH, student=None, tokens=0, block=None, cancel=None):
+        """
+        Holds one of the concurrent API slots for the duration of the block.
+        Interactive requests fail fast with SchedulerBusy when their queue is full;
+        batch requests wait for space unless block=False. A request given a
+        `cancel` threading.Event can be given up with abandon(cancel).
+        """
+        if block is None:
+            block = priority != INTERACTIVE
+        with profiler.stage('queue_wait', priority=priority), self._cond:
+            self._check_quota(student, tokens)
+            while self._queued(priority) >= self.max_queue:
+                if not block:
+                    raise _scheduler_busy(self._queued(priority))
+                self._cond.wait()
+            ticket = (priority, next(self._seq), student)
+            self._waiting.append(ticket)
+            while self._active >= self.max_concurrency or self._next() is not ticket:
+                if cancel is not None and cancel.is_set():
+                    self._waiting.remove(ticket)
+                    self._cond.notify_all()
+                    raise RequestAbandoned("The request was abandoned before it was sent.")
+                self._cond.wait()
+            self._waiting.remove(ticket)
+            self._active += 1
+            if cancel is not None:
+                self._held.add(cancel)
+            if student is not None:
+                self._usage.setdefault(student, deque()).append((time.monotonic(), tokens))
+        try:
+            yield
+        finally:
+            with self._cond:
+                if cancel is None or cancel in self._held: # Else abandon() already gave the slot back
+                    self._held.discard(cancel)
+                    self._active -= 1
+                self._cond.notify_all()
+
+    def abandon(self, cancel):
+        """
+        Gives up the request started with this cancel event: if it is still
+        waiting it raises RequestAbandoned, and if it is in flight its slot goes
+        to the next request now instead of when the response finally arrives.
+        """
+        with self._cond:
+            cancel.set()
+            if cancel in self._held:
+                self._held.remove(cancel)
+                self._active -= 1
+            self._cond.notify_all()
+
+
+@contextmanager
+def locked_json(path, default):
+    """
+    Yields the JSON document at path (or `default` if there is none) under an
+    exclusive fcntl lock on path.lock, and writes it back atomically if the
+    block changed it. Readers that do not change it may read path directly.
+    """
+    path = Path(path)
+    with open(path.with_name(path.name + ".lock"), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    before = f.read()
+                document = json.loads(before)
+            except (FileNotFoundError, json.JSONDecodeError):
+                before, document = None, default
+            try:
+                yield document
+            finally:
+                after = json.dumps(document)
+                if after != before:
+                    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+                    with open(tmp_path, 'w', encoding='utf-8') as f:
+                        f.write(after)
+                    os.replace(tmp_path, path)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass # Alive, but another user's
+    return True
+
+
+class SharedScheduler:
+    """
+    Scheduler's admission control for every process that uses the same state
+    file: Playground kernels and grade.py runs then share one concurrency cap,
+    one priority order and one token quota per student. The state is a small
+    JSON file changed under an exclusive lock; a waiting request polls it every
+    `poll` seconds. Requests of processes that have died are dropped from it.
+    """
+
+    def __init__(self, path, max_concurrency=4, max_queue=32, student_token_quota=30000, window=600, poll=0.05):
+        self.path = Path(path)
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.student_token_quota = student_token_quota
+        self.window = window
+        self.poll = poll
+        self._cond = threading.Condition() # Wakes this process's waiters when one of its slots frees up
+        self._held = {} # cancel event -> lease of an abandonable request holding a slot
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    @contextmanager
+    def _state(self):
+        with locked_json(self.path, {'seq': 0, 'active': {}, 'waiting': [], 'usage': {}}) as state:
+            self._prune(state)
+            yield state
+
+    def _prune(self, state):
+        state['active'] = {lease: entry for lease, entry in state['active'].items() if _running(entry['pid'])}
+        state['waiting'] = [ticket for ticket in state['waiting'] if _running(ticket['pid'])]
+        cutoff = time.time() - self.window
+        state['usage'] = {student: [u for u in usage if u[0] >= cutoff] for student, usage in state['usage'].items()}
+        state['usage'] = {student: usage for student, usage in state['usage'].items() if usage}
+
+    def _recent_usage(self, state, student):
+        return sum(tokens for _, tokens in state['usage'].get(student, ())) if student is not None else 0
+
+    def _charge(self, state, student, tokens):
+        """Adds tokens to the student's usage, coalesced into window/20 buckets so the state stays small."""
+        usage = state['usage'].setdefault(student, [])
+        now = time.time()
+        if usage and now - usage[-1][0] < self.window / 20:
+            usage[-1][1] += tokens
+        else:
+            usage.append([now, tokens])
+
+    @contextmanager
+    def slot(self, priority=BATCH, student=None, tokens=0, block=None, cancel=None):
+        """Holds one of the shared API slots for the duration of the block; see Scheduler.slot."""
+        if block is None:
+            block = priority != INTERACTIVE
+        lease = uuid.uuid4().hex
+        queued = False
+        with profiler.stage('queue_wait', priority=priority):
+            while True:
+                with self._state() as state:
+                    if not queued:
+                        if student is not None and self.student_token_quota and \
+                                self._recent_usage(state, student) + tokens > self.student_token_quota:
+                            usage = state['usage'].get(student)
+                            raise _quota_exceeded((usage[0][0] if usage else time.time()) + self.window - time.time())
+                        waiting = sum(1 for ticket in state['waiting'] if ticket['priority'] == priority)
+                        if waiting < self.max_queue:
+                            state['seq'] += 1
+                            state['waiting'].append({'lease': lease, 'priority': priority, 'seq': state['seq'],
+                                                     'student': student, 'pid': os.getpid()})
+                            queued = True
+                        elif not block:
+                            raise _scheduler_busy(waiting)
+                    if queued and cancel is not None and cancel.is_set():
+                        state['waiting'] = [ticket for ticket in state['waiting'] if ticket['lease'] != lease]
+                        raise RequestAbandoned("The request was abandoned before it was sent.")
+                    if queued and len(state['active']) < self.max_concurrency:
+                        first = min(state['waiting'], key=lambda t: (t['priority'], self._recent_usage(state, t['student']), t['seq']))
+                        if first['lease'] == lease:
+                            state['waiting'].remove(first)
+                            state['active'][lease] = {'pid': os.getpid(), 'since': time.time()}
+                            if student is not None:
+                                self._charge(state, student, tokens)
+                            break
+                with self._cond:
+                    self._cond.wait(self.poll) # Other processes' releases are only seen by polling
+        if cancel is not None:
+            with self._cond:
+                self._held[cancel] = lease
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._held.pop(cancel, None)
+            self._release(lease) # Already gone if abandon() freed it
+
+    def _release(self, lease):
+        with self._state() as state:
+            state['active'].pop(lease, None)
+        with self._cond:
+            self._cond.notify_all()
+
+    def abandon(self, cancel):
+        """Gives up the request started with this cancel event; see Scheduler.abandon."""
+        with self._cond:
+            cancel.set()
+            lease = self._held.pop(cancel, None)
+            self._cond.notify_all()
+        if lease is not None:
+            self._release(lease)
+
+
+_scheduler = Scheduler()
+
+
+def get_scheduler():
+    """The process-wide scheduler shared by every LLM instance."""
+    return _scheduler
+
+
+def configure_scheduler(**kwargs):
+    """Replaces the process-wide scheduler, e.g. configure_scheduler(max_concurrency=8)."""
+    global _scheduler
+    _scheduler = Scheduler(**kwargs)
+    return _scheduler
+
+
+def share_scheduler(path=None, **kwargs):
+    """
+    Makes this process queue its LLM calls with every other process using the
+    SharedScheduler at path (default: $LLM_SCHEDULER_FILE, else SHARED_STATE),
+    unless it already does. Without fcntl (e.g. on Windows) the process keeps
+    its own scheduler. Returns the scheduler in use.
+    """
+    global _scheduler
+    if fcntl is None:
+        return _scheduler
+    path = Path(path or os.getenv('LLM_SCHEDULER_FILE') or SHARED_STATE)
+    if not (isinstance(_scheduler, SharedScheduler) and _scheduler.path == path):
+        _scheduler = SharedScheduler(path, **kwargs)
+    return _scheduler
@@ -0,0 +1,95 @@
+import re
+import json
+import hashlib
+from pathlib import Path
+from results import ResultWriter
+
+SHARD_FILE = re.compile(r"\.shard-(\d+)-of-(\d+)\.json$")
+
+
+class ShardError(ValueError):
+    """Raised when partial results cannot be merged into one complete gradebook."""
+
+
+def parse_shard(spec):
+    """'K/N' -> (K, N), with shards numbered 1..N."""
+    match = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)\s*", spec)
+    if not match:
+        raise ValueError(f"expected K/N, e.g. 1/4, got '{spec}'")
+    k, n = int(match.group(1)), int(match.group(2))
+    if not 1 <= k <= n:
+        raise ValueError(f"shard {k} is not between 1 and {n}")
+    return k, n
+
+
+def shard_of(student_id, n):
+    """The shard (1..n) a student belongs to. Uses SHA-256, not hash(), so every machine agrees."""
+    digest = hashlib.sha256(student_id.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % n + 1
+
+
+def shard_path(results_path, k, n):
+    """grading_results.json -> grading_results.shard-K-of-N.json"""
+    path = Path(results_path)
+    return str(path.with_name(f"{path.stem}.shard-{k}-of-{n}{path.suffix}"))
+
+
+def find_shards(results_path):
+    """Partial results files for results_path in its folder."""
+    path = Path(results_path)
+    return sorted(str(p) for p in path.parent.glob(f"{path.stem}.shard-*-of-*{path.suffix}"))
+
+
+def merge_shards(paths, results_path, expected=None):
+    """
+    Combines partial results files into results_path. Raises ShardError, writing
+    nothing, unless the files are shards 1..N of one split, each student is in
+    exactly one of them (the shard their ID hashes to) and, if `expected`
+    student IDs are given, none of them is missing.
+    Returns the number of students merged.
+    """
+    shards = {}
+    for path in paths:
+        match = SHARD_FILE.search(Path(path).name)
+        if not match:
+            raise ShardError(f"{path} is not named like a shard file (*.shard-K-of-N.json)")
+        k, n = int(match.group(1)), int(match.group(2))
+        if (k, n) in shards:
+            raise ShardError(f"shard {k}/{n} given twice")
+        shards[(k, n)] = path
+
+    counts = {n for _, n in shards}
+    if len(counts) != 1:
+        raise ShardError(f"files come from different splits: {', '.join(f'{k}/{n}' for k, n in sorted(shards))}")
+    n = counts.pop()
+    missing = [k for k in range(1, n + 1) if (k, n) not in shards]
+    if missing:
+        raise ShardError(f"missing shard(s) {', '.join(f'{k}/{n}' for k in missing)}")
+
+    merged = {}
+    owner = {}
+    problems = []
+    for (k, _), path in sorted(shards.items()):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                results = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ShardError(f"{path} is not valid JSON ({e}); was that shard interrupted?") from e
+        for student_id, result in results.items():
+            if student_id in owner:
+                problems.append(f"{student_id} is in shard {owner[student_id]} and shard {k}")
+                continue
+            if shard_of(student_id, n) != k:
+                problems.append(f"{student_id} belongs to shard {shard_of(student_id, n)}, not {k}")
+            owner[student_id] = k
+            merged[student_id] = result
+    if expected is not None:
+        problems.extend(f"{student_id} is in no shard (expected in shard {shard_of(student_id, n)})"
+                        for student_id in sorted(set(expected) - set(merged)))
+    if problems:
+        raise ShardError("\n".join(problems))
+
+    with ResultWriter(results_path) as writer:
+        for student_id in sorted(merged): # Same order as an unsharded run
+            writer.add(student_id, merged[student_id])
+    return len(merged)
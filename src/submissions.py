@@ -0,0 +1,177 @@
+import io
+import bz2
+import gzip
+import json
+import lzma
+import hashlib
+import tarfile
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from logs import log
+
+# Submissions larger than this are rejected before they are decoded.
+MAX_SUBMISSION_BYTES = 5 * 1024 * 1024
+
+# Single compressed submissions, e.g. answers_123.json.gz
+COMPRESSED = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
+
+class InvalidSubmission(ValueError):
+    """Raised when an uploaded file is not a usable answers_*.json submission."""
+
+
+class LazySubmission:
+    """A student submission that is only decoded when it is graded."""
+
+    def __init__(self, student_id, opener, digest):
+        self.student_id = student_id
+        self.digest = digest
+        self._opener = opener
+
+    def load(self):
+        with self._opener() as f:
+            return json.load(io.TextIOWrapper(f, encoding='utf-8'))
+
+
+def is_answer_file(name):
+    """True for 'answers_<id>.json' entries, ignoring folders and OS junk files."""
+    path = PurePosixPath(name.replace('\\', '/'))
+    if any(part.startswith(('.', '__MACOSX')) for part in path.parts):
+        return False
+    return path.name.startswith('answers_') and path.name.endswith('.json')
+
+
+def validate_submission(data):
+    """Checks that decoded JSON has the {q_id: {'answers': [...]}} shape."""
+    if not isinstance(data, dict):
+        raise InvalidSubmission("top level is not an object")
+    for q_id, content in data.items():
+        if not isinstance(content, dict) or not isinstance(content.get('answers'), list):
+            raise InvalidSubmission(f"question {q_id} has no 'answers' list")
+
+
+def _hash_stream(f):
+    """Hashes and validates one entry in fixed-size chunks, then discards it."""
+    digest = hashlib.sha256()
+    size = 0
+    chunks = []
+    while True:
+        chunk = f.read(64 * 1024)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > MAX_SUBMISSION_BYTES:
+            raise InvalidSubmission(f"larger than {MAX_SUBMISSION_BYTES} bytes")
+        digest.update(chunk)
+        chunks.append(chunk)
+    try:
+        validate_submission(json.loads(b''.join(chunks).decode('utf-8')))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise InvalidSubmission(f"invalid JSON: {e}") from e
+    return digest.hexdigest()
+
+
+def iter_zip(data):
+    """Yields a LazySubmission per answers_*.json entry of a ZIP archive; repeated file names are skipped."""
+    archive = zipfile.ZipFile(io.BytesIO(data))
+    seen = {}
+    for info in archive.infolist():
+        if info.is_dir() or not is_answer_file(info.filename):
+            continue
+        student_id = PurePosixPath(info.filename).name
+        if student_id in seen:
+            log.warning(f"Skipping {info.filename}: {student_id} was already read from {seen[student_id]}")
+            continue
+        try:
+            with archive.open(info) as f:
+                digest = _hash_stream(f)
+        except InvalidSubmission as e:
+            log.warning(f"Skipping {info.filename}: {e}")
+            continue
+        seen[student_id] = info.filename
+        yield LazySubmission(student_id, lambda info=info: archive.open(info), digest)
+
+
+def iter_tar(data):
+    """Yields a LazySubmission per answers_*.json entry of a (compressed) tar archive; repeated file names are skipped."""
+    archive = tarfile.open(fileobj=io.BytesIO(data), mode='r:*')
+    seen = {}
+    for member in archive:
+        if not member.isfile() or not is_answer_file(member.name):
+            continue
+        student_id = PurePosixPath(member.name).name
+        if student_id in seen:
+            log.warning(f"Skipping {member.name}: {student_id} was already read from {seen[student_id]}")
+            continue
+        try:
+            digest = _hash_stream(archive.extractfile(member))
+        except InvalidSubmission as e:
+            log.warning(f"Skipping {member.name}: {e}")
+            continue
+        seen[student_id] = member.name
+        yield LazySubmission(student_id, lambda member=member: archive.extractfile(member), digest)
+
+
+def iter_upload(name, data):
+    """Yields LazySubmissions for one uploaded file: a single (compressed) JSON, a ZIP or a tar."""
+    lower = name.lower()
+    if lower.endswith('.zip'):
+        yield from iter_zip(data)
+    elif lower.endswith(('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')):
+        yield from iter_tar(data)
+    elif lower.endswith('.json'):
+        try:
+            digest = _hash_stream(io.BytesIO(data))
+        except InvalidSubmission as e:
+            log.warning(f"Skipping {name}: {e}")
+            return
+        yield LazySubmission(name, lambda: io.BytesIO(data), digest)
+    elif lower.endswith(tuple(COMPRESSED)) and lower.rsplit('.', 1)[0].endswith('.json'):
+        inner, suffix = name.rsplit('.', 1)
+        try:
+            with COMPRESSED['.' + suffix.lower()](io.BytesIO(data)) as f:
+                content = f.read(MAX_SUBMISSION_BYTES + 1) # Never inflate more than one submission's worth
+        except (OSError, EOFError, lzma.LZMAError) as e:
+            log.warning(f"Skipping {name}: could not decompress ({e})")
+            return
+        yield from iter_upload(inner, content)
+    else:
+        log.warning(f"Skipping {name}: unsupported file type")
+
+
+def iter_directory(directory):
+    """Yields a LazySubmission per answers_*.json file in a folder, without reading any of them."""
+    for path in sorted(Path(directory).glob("answers_*.json")):
+        yield LazySubmission(path.name, lambda path=path: open(path, 'rb'), None)
+
+
+def prefetch(items, window=8):
+    """
+    Yields (student_id, submission, error) for (student_id, submission) items,
+    decoding up to `window` LazySubmissions ahead in a background thread.
+    error is the exception a submission failed to load with, else None.
+    """
+    items = iter(items)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch") as pool:
+        def fill():
+            for student_id, submission in items:
+                if isinstance(submission, LazySubmission):
+                    submission = pool.submit(submission.load)
+                pending.append((student_id, submission))
+                if len(pending) >= window:
+                    return
+
+        fill()
+        while pending:
+            student_id, submission = pending.popleft()
+            fill()
+            if isinstance(submission, Future):
+                try:
+                    submission = submission.result()
+                except (OSError, ValueError) as e: # Unreadable file, invalid JSON or encoding
+                    yield student_id, None, e
+                    continue
+            yield student_id, submission, None
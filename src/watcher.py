@@ -0,0 +1,87 @@
+import json
+import time
+import hashlib
+from pathlib import Path
+from logs import log
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:  # Not Linux, or the optional package is not installed
+    INotify = None
+
+STATE_FILENAME = ".grade_state.json"
+
+
+def file_digest(path):
+    """SHA-256 of a file's content, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SubmissionWatcher:
+    """Tracks answers_*.json files in a directory and reports new or modified ones by content hash."""
+
+    def __init__(self, results_dir, interval=5.0):
+        self.results_dir = Path(results_dir)
+        self.interval = interval
+        self.state_path = self.results_dir / STATE_FILENAME
+        self._state = self._load_state()
+        self._inotify = None
+        if INotify is not None:
+            try:
+                self._inotify = INotify()
+                self._inotify.add_watch(str(self.results_dir), flags.CLOSE_WRITE | flags.MOVED_TO)
+            except OSError as e:
+                log.warning(f"inotify unavailable ({e}); falling back to polling every {interval}s.")
+                self._inotify = None
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def changed(self):
+        """Returns the submission files whose content differs from the last graded version."""
+        changed = []
+        for path in sorted(self.results_dir.glob("answers_*.json")):
+            stat = path.stat()
+            entry = self._state.get(path.name)
+            # Only hash files whose size or mtime moved since they were last graded
+            if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+                continue
+            digest = file_digest(path)
+            if entry and entry['digest'] == digest:
+                entry['mtime'] = stat.st_mtime
+                continue
+            changed.append(path)
+        return changed
+
+    def mark_graded(self, path, digest, stat):
+        """
+        Records the graded content of a submission so it is skipped until it changes again.
+        stat must be taken before the content was read: a rewrite after that then shows up
+        as a changed size or mtime, and is caught by the digest on the next scan.
+        """
+        self._state[path.name] = {'digest': digest, 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    def save(self):
+        tmp_path = self.state_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._state, f)
+        tmp_path.replace(self.state_path)
+
+    def wait(self):
+        """Blocks until something in the directory may have changed."""
+        if self._inotify is not None:
+            # Wake on file events, but still rescan periodically in case events were missed
+            events = self._inotify.read(timeout=int(self.interval * 1000 * 12))
+            if events:
+                time.sleep(0.5)  # Let a burst of writes settle before rescanning
+                self._inotify.read(timeout=0)
+        else:
+            time.sleep(self.interval)
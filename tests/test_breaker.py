@@ -0,0 +1,116 @@
+import httpx
+import openai
+import pytest
+
+import breaker
+import fake_llm
+import LLM as llm_module
+from breaker import CLOSED, OPEN, BreakerBoard, CircuitBreaker, CircuitOpen, configure_breakers
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(breaker.time, 'monotonic', clock)
+    return clock
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers():
+    configure_breakers()
+    yield
+    configure_breakers()
+    fake_llm.reset()
+
+
+def test_sequential_stall_opens_circuit(clock):
+    # One 60s timeout per call: the 60s window never holds min_calls calls
+    cb = CircuitBreaker('test:stalled', min_calls=10, window=60.0)
+    for _ in range(3):
+        cb.allow()
+        clock.now += 60.0
+        cb.record(True)
+    assert cb.state == OPEN
+    with pytest.raises(CircuitOpen):
+        cb.allow()
+
+
+def test_probe_after_cooldown_closes_circuit(clock):
+    cb = CircuitBreaker('test:probe', consecutive_failures=2, cooldown=30.0)
+    cb.record(True)
+    cb.record(True)
+    with pytest.raises(CircuitOpen):
+        cb.allow()
+    clock.now += 31.0
+    cb.allow()  # the half-open probe
+    with pytest.raises(CircuitOpen):
+        cb.allow()  # only one probe at a time
+    cb.record(False, 1.0)
+    assert cb.state == CLOSED
+    cb.allow()
+
+
+def test_success_resets_the_failure_streak(clock):
+    cb = CircuitBreaker('test:flaky', consecutive_failures=3)
+    for failed in (True, True, False, True, True):
+        cb.record(failed, 1.0)
+    assert cb.state == CLOSED
+
+
+def test_stalled_backend_fails_fast_after_timeouts(monkeypatch):
+    calls = []
+
+    def timeout(self, model, messages, **kwargs):
+        calls.append(model)
+        raise openai.APITimeoutError(request=httpx.Request("POST", "http://fake/v1/chat/completions"))
+
+    monkeypatch.setattr(fake_llm.FakeBackend, 'create', timeout)
+    monkeypatch.setattr(llm_module, 'backoff_delay', lambda attempt: 0.0)
+    llm = llm_module.LLM('fake:stalled')
+
+    with pytest.raises(CircuitOpen):
+        llm.chat_completion_openai("first")  # three timeouts in a row open the circuit mid-call
+    with pytest.raises(CircuitOpen):
+        llm.chat_completion_openai("second")
+    assert len(calls) == 3
+
+
+def test_rate_limits_do_not_open_circuit(monkeypatch):
+    def rate_limited(self, model, messages, **kwargs):
+        response = httpx.Response(429, headers={'retry-after': '0'},
+                                  request=httpx.Request("POST", "http://fake/v1/chat/completions"))
+        raise openai.RateLimitError("Fake rate limit", response=response, body=None)
+
+    monkeypatch.setattr(fake_llm.FakeBackend, 'create', rate_limited)
+    llm = llm_module.LLM('fake:limited')
+    with pytest.raises(ConnectionError):
+        llm.chat_completion_openai("prompt")
+    assert breaker.get_breaker('fake:limited').state == CLOSED
+
+
+def test_circuit_opened_in_one_process_is_open_in_another(tmp_path):
+    path = tmp_path / "breakers.json"
+    # Two kernels: each has its own breaker and its own view of the board
+    first = CircuitBreaker('openai:gpt-4o-mini', consecutive_failures=2, board=BreakerBoard(path))
+    second = CircuitBreaker('openai:gpt-4o-mini', board=BreakerBoard(path, refresh=0))
+    second.allow()
+    first.record(True)
+    first.record(True)
+    assert first.state == OPEN
+    with pytest.raises(CircuitOpen):
+        second.allow() # Without a single failed call of its own
+
+    first._opened -= first.cooldown # The probe after the cooldown succeeds
+    first.allow()
+    first.record(False)
+    assert first.state == CLOSED
+    third = CircuitBreaker('openai:gpt-4o-mini', board=BreakerBoard(path))
+    third.allow()
@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+import drafts
+from drafts import AttemptHistory, DraftLog
+
+
+def test_compact_keeps_the_latest_record_per_question(tmp_path):
+    log = DraftLog(str(tmp_path / "drafts.jsonl"))
+    log.append({'q1': ["a"], 'q2': ["b"]})
+    log.append({'q1': ["c"]})
+    assert log.compact() == {'q1': ["c"], 'q2': ["b"]}
+    assert len((tmp_path / "drafts.jsonl").read_text().splitlines()) == 2
+
+
+def test_failed_compact_removes_its_temp_file(tmp_path, monkeypatch):
+    path = tmp_path / "drafts.jsonl"
+    log = DraftLog(str(path))
+    log.append({'q1': ["a"]})
+    before = path.read_bytes()
+
+    def fail(src, dst):
+        raise OSError("disk full")
+    monkeypatch.setattr(drafts.os, 'replace', fail)
+    with pytest.raises(OSError):
+        log.compact()
+    assert os.listdir(tmp_path) == ["drafts.jsonl"]
+    assert path.read_bytes() == before
+
+
+def test_attempt_numbers_continue_after_a_restart(tmp_path):
+    path = str(tmp_path / "attempts_s1.jsonl.gz")
+    history = AttemptHistory('q1', path, keep=2, batch=3)
+    for i in range(6):
+        history.append({'avg_rates': i / 10})
+    assert history.summary()['spilled'] == 4
+    other = AttemptHistory('q2', path, keep=2)
+    other.append({'avg_rates': 0.5})
+
+    restarted = AttemptHistory('q1', path, keep=2, batch=3)
+    assert restarted.count == 4 and restarted.best_avg_rates == 0.3
+    for i in range(3):
+        restarted.append({'avg_rates': 0.0})
+    assert [a['attempt'] for a in restarted.spilled_attempts()] == [1, 2, 3, 4, 5]
+
+
+def test_spilled_attempts_are_written_in_batches(tmp_path):
+    path = tmp_path / "attempts_s1.jsonl.gz"
+    history = AttemptHistory('q1', str(path), keep=1, batch=4)
+    for i in range(4):
+        history.append({'avg_rates': 1.0})
+    assert not path.exists() # Three attempts spilled, still pending
+    history.append({'avg_rates': 1.0})
+    assert path.read_bytes().count(b"\x1f\x8b\x08") == 1
@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+import fake_llm
+from Grader import Grader
+from prescreen import PreScreen
+
+ASSIGNMENT = {'questions': [
+    {'id': 1, 'instructions': ["Explain two's complement."]},
+    {'id': 2, 'instructions': ["Write a function that adds two numbers."], 'testcases': ["add(1, 2) == 3"]},
+]}
+
+
+@pytest.fixture
+def grader(tmp_path):
+    fake_llm.reset()
+    path = tmp_path / "assignment.json"
+    path.write_text(json.dumps(ASSIGNMENT))
+    g = Grader()
+    g.set_model('fake:grader')
+    g.load_assignment(path)
+    g.results_path = str(tmp_path / "grading_results.json")
+    return g
+
+
+def test_malformed_submission_does_not_stop_grading(grader):
+    grader._student_answers['answers_bad.json'] = {'q1': {'text': "no answers list"}}
+    grader._student_answers['answers_good.json'] = {'q1': {'answers': ["Invert and add one."]}}
+    assert grader.grade() == {'answers_good.json'}
+    with open(grader.results_path, encoding='utf-8') as f:
+        assert list(json.load(f)) == ['answers_good.json']
+
+
+def regrade(grader):
+    grader.final_results = {}
+    grader.load_previous_results(grader.results_path)
+    fake_llm.reset()
+    grader.grade()
+    return fake_llm.FakeBackend.calls
+
+
+@pytest.fixture
+def graded(grader):
+    grader._student_answers['answers_s1.json'] = {'q1': {'answers': ["Invert and add one."]},
+                                                  'q2': {'answers': ["def add(a, b): return a + b"]}}
+    grader.grade()
+    return grader
+
+
+def test_regrade_reuses_unchanged_cells(graded):
+    assert regrade(graded) == 0
+
+
+def test_regrade_grades_again_after_an_ensemble_change(graded, monkeypatch):
+    # Unanimous verdicts and quorum: no request is left running to be counted in the next regrade
+    monkeypatch.setattr(fake_llm.FakeBackend, 'pass_rate', 1.0)
+    graded.llm.set_ensemble(['fake:a', 'fake:b', 'fake:c'], quorum=3)
+    assert regrade(graded) > 0
+    assert regrade(graded) == 0
+
+
+def test_regrade_grades_again_after_a_prescreen_change(graded):
+    graded.llm.prescreen = PreScreen()
+    assert regrade(graded) > 0
+    graded.llm.prescreen = None
+    assert regrade(graded) > 0
+
+
+def test_regrade_grades_again_after_a_fallback_change(graded):
+    graded.llm.set_fallback('fake:fallback')
+    assert regrade(graded) > 0
@@ -0,0 +1,10 @@
+import fake_llm
+from LLM import LLM
+
+
+def test_compare_many_without_items_makes_no_calls():
+    fake_llm.reset()
+    llm = LLM('fake:compare')
+    assert llm.compare_many([], 'abc') == ([], "")
+    assert llm.compare_many([]) == ([], "")
+    assert fake_llm.FakeBackend.calls == 0
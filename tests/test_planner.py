@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+from Grader import Grader
+from planner import PRICES, plan_cost, plan_grading
+
+
+@pytest.fixture
+def grader(tmp_path, monkeypatch):
+    monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+    monkeypatch.delenv('GEMINI_API_KEY', raising=False)
+    assignment = tmp_path / "assignment.json"
+    assignment.write_text(json.dumps({'questions': [
+        {'id': 1, 'instructions': ["Write a function that adds two numbers."], 'testcases': ["add(1, 2) == 3"]}]}))
+    g = Grader()
+    g.load_assignment(assignment)
+    g._student_answers['answers_alice.json'] = {'q1': {'answers': ["def add(a, b):\n    return a + b"]}}
+    return g
+
+
+def test_plan_needs_no_api_key(grader):
+    plans = plan_grading(grader)
+    assert set(plans['q1'].tokens) == {'gpt-4o-mini'}
+    assert grader.llm._backend is None
+
+
+def test_ensemble_models_are_priced_at_their_own_rate(grader):
+    grader.llm.set_ensemble(['gpt-4o', 'gemini-1.5-flash'])
+    plans = plan_grading(grader, pass_rate=1.0)
+    tokens = plans['q1'].tokens
+    assert set(tokens) == {'gpt-4o', 'gemini-1.5-flash'}
+    costs, unpriced = plan_cost(plans, grader.llm.model)
+    assert unpriced == []
+    for model, (prompt, completion) in tokens.items():
+        price_in, price_out = PRICES[model]
+        assert costs[model] == pytest.approx((prompt * price_in + completion * price_out) / 1e6)
+    assert costs['gpt-4o'] > costs['gemini-1.5-flash']
@@ -0,0 +1,35 @@
+import pytest
+
+import breaker
+import fake_llm
+import scheduler
+
+QUESTION = {'text': "Add two numbers.", 'instructions': ["Write add(a, b)."], 'testcases': ["add(1, 2) == 3"]}
+
+
+@pytest.fixture
+def playground(tmp_path, monkeypatch):
+    from playground import Playground
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('LLM_SCHEDULER_FILE', str(tmp_path / "scheduler" / "state.json"))
+    monkeypatch.setattr(scheduler, '_scheduler', scheduler._scheduler) # Restored after the test
+    monkeypatch.setattr(breaker, '_board', breaker._board)
+    fake_llm.reset()
+    p = Playground()
+    p.set_model('fake:playground')
+    p.add_whitelist("s1")
+    p.verify("s1")
+    p.create_question(QUESTION['text'])
+    p.add_instruction(QUESTION['instructions'][0], QUESTION['testcases'])
+    p._displayable[p._curr_question]['answers'][0].value = "def add(a, b): return a + b"
+    return p
+
+
+def test_speculative_grading_is_not_charged_to_the_students_quota(playground):
+    playground.speculative = True
+    q_id = playground._curr_question
+    playground._speculate(q_id)
+    assert playground._speculative_result(q_id) is not None
+    with scheduler.get_scheduler()._state() as state:
+        assert "s1" not in state['usage']
+        assert state['usage']["s1 (speculative)"]
@@ -0,0 +1,35 @@
+import fake_llm
+from LLM import LLM
+from prescreen import PreScreen
+
+
+def test_short_correct_answers_reach_the_grader():
+    screen = PreScreen()
+    for answer in ["42", "O(n)", "5", "x=3"]:
+        verdict = screen.screen(["What is the time complexity of a linear scan?"], [answer])
+        assert verdict.action != 'reject', answer
+
+
+def test_empty_and_placeholder_answers_are_rejected():
+    screen = PreScreen()
+    assert screen.screen(["Explain recursion."], [""]).reason == 'empty'
+    assert screen.screen(["Explain recursion."], ["  ...  "]).reason == 'empty'
+    assert screen.screen(["Explain recursion."], ["idk"]).reason == 'placeholder answer'
+
+
+def test_words_that_can_be_correct_are_not_placeholders():
+    screen = PreScreen()
+    for answer in ["None", "pass", "nothing", "N/A"]:
+        assert screen.screen(["What does this function return?"], [answer]).action != 'reject', answer
+    assert screen.screen(["Explain recursion."], ["none"], bad_answers=["none"]).reason == 'placeholder answer'
+
+
+def test_packed_questions_use_their_own_examples():
+    fake_llm.reset()
+    llm = LLM('fake:prescreen')
+    llm.prescreen = PreScreen()
+    questions = [('q1', ["Name a sorting algorithm."], ["bubble"], None, None, ["bubble"]),
+                 ('q2', ["Name a data structure."], ["heap"], None, None, None)]
+    results = llm.grade_conceptual_questions(questions)
+    assert "placeholder answer" in results['q1'][3]
+    assert "placeholder" not in results['q2'][3]
@@ -0,0 +1,36 @@
+import json
+
+import pytest
+
+from results import ResultWriter
+
+
+def write(path, results, complete=True, merge=False):
+    with ResultWriter(str(path), merge=merge) as writer:
+        for student_id, result in results.items():
+            writer.add(student_id, result)
+        writer.complete = complete
+
+
+def test_complete_run_replaces_results(tmp_path):
+    path = tmp_path / "grading_results.json"
+    write(path, {'a': 1, 'b': 2})
+    write(path, {'a': 3})
+    assert json.loads(path.read_text()) == {'a': 3}
+
+
+def test_incomplete_run_keeps_unreached_students(tmp_path):
+    path = tmp_path / "grading_results.json"
+    write(path, {'a': 1, 'b': 2})
+    write(path, {'a': 3}, complete=False)
+    assert json.loads(path.read_text()) == {'a': 3, 'b': 2}
+
+
+def test_interrupted_run_keeps_unreached_students(tmp_path):
+    path = tmp_path / "grading_results.json"
+    write(path, {'a': 1, 'b': 2})
+    with pytest.raises(KeyboardInterrupt):
+        with ResultWriter(str(path)) as writer:
+            writer.add('a', 3)
+            raise KeyboardInterrupt
+    assert json.loads(path.read_text()) == {'a': 3, 'b': 2}
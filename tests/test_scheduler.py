@@ -0,0 +1,97 @@
+import os
+import sys
+import time
+import threading
+import subprocess
+from pathlib import Path
+
+from scheduler import BATCH, INTERACTIVE, RequestAbandoned, Scheduler, SharedScheduler
+
+# One request in its own process, like a Playground kernel or a grade.py run
+CHILD = """
+import sys
+from scheduler import SharedScheduler
+path, priority, name, order = sys.argv[1:]
+with SharedScheduler(path, max_concurrency=1, poll=0.01).slot(int(priority), student=name):
+    with open(order, 'a') as f:
+        f.write(name + "\\n")
+"""
+
+
+def test_abandoned_request_gives_its_slot_back_at_once():
+    scheduler = Scheduler(max_concurrency=1)
+    cancel, finish, holding = threading.Event(), threading.Event(), threading.Event()
+
+    def straggler():
+        with scheduler.slot(cancel=cancel):
+            holding.set()
+            finish.wait() # Still waiting for its response
+
+    thread = threading.Thread(target=straggler)
+    thread.start()
+    holding.wait()
+    scheduler.abandon(cancel)
+    with scheduler.slot(): # Would block forever if the straggler kept its slot
+        assert scheduler._active == 1
+    finish.set()
+    thread.join()
+    assert scheduler._active == 0
+
+
+def test_abandoned_request_stops_waiting():
+    scheduler = Scheduler(max_concurrency=1)
+    cancel = threading.Event()
+    errors = []
+
+    def waiter():
+        try:
+            with scheduler.slot(cancel=cancel):
+                pass
+        except RequestAbandoned as e:
+            errors.append(e)
+
+    with scheduler.slot():
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        while not scheduler._waiting:
+            pass
+        scheduler.abandon(cancel)
+        thread.join(timeout=5)
+    assert len(errors) == 1 and not scheduler._waiting and scheduler._active == 0
+
+
+def test_interactive_calls_from_another_process_go_before_batch_calls(tmp_path):
+    path, order = tmp_path / "state.json", tmp_path / "order.txt"
+    scheduler = SharedScheduler(path, max_concurrency=1, poll=0.01)
+    env = {**os.environ, 'PYTHONPATH': str(Path(__file__).resolve().parent.parent / "src")}
+    children = []
+
+    def start(priority, name):
+        children.append(subprocess.Popen([sys.executable, "-c", CHILD, str(path), str(priority), name, str(order)], env=env))
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            with scheduler._state() as state:
+                if any(ticket['student'] == name for ticket in state['waiting']):
+                    return
+            time.sleep(0.01)
+        raise AssertionError(f"{name} never queued")
+
+    with scheduler.slot(BATCH): # The only slot is busy while both requests queue up
+        start(BATCH, "grader")
+        start(INTERACTIVE, "student")
+    for child in children:
+        assert child.wait(timeout=30) == 0
+    assert order.read_text().split() == ["student", "grader"]
+    with scheduler._state() as state:
+        assert not state['active'] and not state['waiting']
+
+
+def test_requests_of_a_dead_process_are_dropped(tmp_path):
+    path = tmp_path / "state.json"
+    child = subprocess.Popen([sys.executable, "-c", "pass"])
+    child.wait()
+    scheduler = SharedScheduler(path, max_concurrency=1, poll=0.01)
+    with scheduler._state() as state:
+        state['active']['crashed'] = {'pid': child.pid, 'since': time.time()}
+    with scheduler.slot(): # Would wait forever on the crashed process's slot
+        pass
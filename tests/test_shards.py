@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+from shards import ShardError, merge_shards, shard_of, shard_path
+
+STUDENTS = [f"answers_s{i}.json" for i in range(30)]
+
+
+def write_shards(tmp_path, n=3, students=STUDENTS):
+    results = tmp_path / "grading_results.json"
+    paths = []
+    for k in range(1, n + 1):
+        path = shard_path(results, k, n)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({s: {'q1': {'avg_rates': 1.0}} for s in students if shard_of(s, n) == k}, f)
+        paths.append(path)
+    return results, paths
+
+
+def test_complete_shards_merge(tmp_path):
+    results, paths = write_shards(tmp_path)
+    assert merge_shards(paths, results, expected=STUDENTS) == len(STUDENTS)
+    with open(results, encoding='utf-8') as f:
+        assert sorted(json.load(f)) == sorted(STUDENTS)
+
+
+def test_missing_shard_is_refused(tmp_path):
+    results, paths = write_shards(tmp_path)
+    with pytest.raises(ShardError, match="missing shard"):
+        merge_shards(paths[:2], results)
+    assert not results.exists()
+
+
+def test_shards_of_different_splits_are_refused(tmp_path):
+    results, paths = write_shards(tmp_path)
+    _, others = write_shards(tmp_path, n=2)
+    with pytest.raises(ShardError, match="different splits"):
+        merge_shards(paths + others[:1], results)
+
+
+def test_shard_given_twice_is_refused(tmp_path):
+    results, paths = write_shards(tmp_path)
+    with pytest.raises(ShardError, match="given twice"):
+        merge_shards(paths + paths[:1], results)
+
+
+def test_badly_named_or_truncated_shard_is_refused(tmp_path):
+    results, paths = write_shards(tmp_path)
+    with pytest.raises(ShardError, match="not named like a shard"):
+        merge_shards([str(tmp_path / "grading_results.json")], results)
+    with open(paths[0], 'w', encoding='utf-8') as f:
+        f.write('{"answers_s1.json": {')
+    with pytest.raises(ShardError, match="interrupted"):
+        merge_shards(paths, results)
+
+
+def test_student_in_two_shards_is_refused(tmp_path):
+    results, paths = write_shards(tmp_path)
+    student = next(s for s in STUDENTS if shard_of(s, 3) == 1)
+    with open(paths[1], encoding='utf-8') as f:
+        second = json.load(f)
+    second[student] = {'q1': {'avg_rates': 0.0}}
+    with open(paths[1], 'w', encoding='utf-8') as f:
+        json.dump(second, f)
+    with pytest.raises(ShardError, match=f"{student} is in shard 1 and shard 2"):
+        merge_shards(paths, results)
+    assert not results.exists()
+
+
+def test_student_in_the_wrong_shard_is_refused(tmp_path):
+    student = next(s for s in STUDENTS if shard_of(s, 2) == 1)
+    results, paths = write_shards(tmp_path, n=2, students=[])
+    with open(paths[1], 'w', encoding='utf-8') as f:
+        json.dump({student: {}}, f)
+    with pytest.raises(ShardError, match=f"{student} belongs to shard 1, not 2"):
+        merge_shards(paths, results)
+
+
+def test_student_in_no_shard_is_refused(tmp_path):
+    results, paths = write_shards(tmp_path, students=STUDENTS[:-1])
+    with pytest.raises(ShardError, match=f"{STUDENTS[-1]} is in no shard"):
+        merge_shards(paths, results, expected=STUDENTS)
+    assert not results.exists()
+
+
+def test_merge_command_checks_the_submissions_folder(tmp_path, monkeypatch, capsys):
+    import grade
+    monkeypatch.chdir(tmp_path)
+    submissions = tmp_path / "result"
+    submissions.mkdir()
+    for student in STUDENTS:
+        (submissions / student).write_text('{}')
+    _, paths = write_shards(tmp_path, students=STUDENTS[1:])
+    with pytest.raises(SystemExit):
+        grade.merge(["--submissions", str(submissions)])
+    assert f"{STUDENTS[0]} is in no shard" in capsys.readouterr().out
+    assert not (tmp_path / "grading_results.json").exists()
+
+    (submissions / STUDENTS[0]).unlink()
+    grade.merge(["--submissions", str(submissions), *paths])
+    assert f"Merged {len(STUDENTS) - 1} students from 3 shards" in capsys.readouterr().out
@@ -0,0 +1,51 @@
+import io
+import bz2
+import gzip
+import json
+import tarfile
+import zipfile
+
+from submissions import MAX_SUBMISSION_BYTES, iter_upload
+
+ANSWERS = json.dumps({'q1': {'answers': ["binary"]}}).encode('utf-8')
+
+
+def test_compressed_json_upload():
+    for name, data in [("answers_s1.json.gz", gzip.compress(ANSWERS)), ("answers_s1.json.bz2", bz2.compress(ANSWERS))]:
+        (submission,) = iter_upload(name, data)
+        assert submission.student_id == "answers_s1.json"
+        assert submission.load() == json.loads(ANSWERS)
+
+
+def test_bad_or_oversized_compressed_upload_is_skipped(capsys):
+    assert list(iter_upload("answers_s1.json.gz", b"not gzip")) == []
+    huge = gzip.compress(b" " * (MAX_SUBMISSION_BYTES + 10))
+    assert list(iter_upload("answers_s2.json.gz", huge)) == []
+    output = capsys.readouterr().out
+    assert "could not decompress" in output and "larger than" in output
+
+
+def test_other_gz_is_unsupported(capsys):
+    assert list(iter_upload("notes.txt.gz", gzip.compress(b"hi"))) == []
+    assert "unsupported file type" in capsys.readouterr().out
+
+
+def test_repeated_file_name_in_archive_is_skipped(capsys):
+    other = json.dumps({'q1': {'answers': ["decimal"]}}).encode('utf-8')
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr("a/answers_s1.json", ANSWERS)
+        archive.writestr("b/answers_s1.json", other)
+    (submission,) = iter_upload("class.zip", buffer.getvalue())
+    assert submission.load() == json.loads(ANSWERS)
+    assert "b/answers_s1.json: answers_s1.json was already read from a/answers_s1.json" in capsys.readouterr().out
+
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w:gz') as archive:
+        for name, data in [("a/answers_s1.json", ANSWERS), ("b/answers_s1.json", other)]:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    (submission,) = iter_upload("class.tar.gz", buffer.getvalue())
+    assert submission.load() == json.loads(ANSWERS)
+    assert "already read from a/answers_s1.json" in capsys.readouterr().out
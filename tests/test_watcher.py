@@ -0,0 +1,19 @@
+import os
+
+from watcher import SubmissionWatcher, file_digest
+
+
+def test_rewrite_during_grading_is_detected(tmp_path):
+    path = tmp_path / "answers_s1.json"
+    path.write_text('{"q1": {"answers": ["first"]}}')
+    watcher = SubmissionWatcher(tmp_path, interval=0.1)
+    assert watcher.changed() == [path]
+
+    stat = path.stat()
+    digest = file_digest(path)
+    # The student saves again while the first version is being graded
+    path.write_text('{"q1": {"answers": ["second, longer"]}}')
+    os.utime(path, (stat.st_atime, stat.st_mtime + 1))
+    watcher.mark_graded(path, digest, stat)
+
+    assert watcher.changed() == [path]